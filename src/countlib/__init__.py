@@ -1,9 +1,23 @@
 """ countlib - Charged up Counters.
 """
 from acount import AdvancedCounter
+from acount import LazyCounter
+from acount import CounterSnapshot
 from xcount import ExtremeCounter
 from pivot import PivotCounter
 from pivot import CoolPivotCounter
+from countindex import CountIndex
+from dcount import DenseCounter
+from mcount import MappedCounter
+from scount import SpaceSavingCounter
+from wcount import WindowCounter
+from decay import DecayingCounter
+from sketch import CountMinSketch
+from sketch import HyperLogLog
+from sharded import ShardedCounter
+from ccount import ConcurrentCounter
+from parallel import count_parallel
+from parallel import count_file
 
 
 if __name__ == '__main__':
@@ -1,18 +1,65 @@
 """ Counters strike! """
 from collections import Mapping
+from weakref import ref
 from pivot import PivotCounter
+from tools import tally, fold_tally, iter_chunks
 
-from itertools import chain, repeat, starmap
+from itertools import chain, repeat, starmap, compress, izip, imap, ifilterfalse
+from functools import partial
 from operator import itemgetter
+from operator import add, sub, mul, div, floordiv, truediv, mod, xor, rshift, lshift
+from operator import lt, not_
 from heapq import nlargest, nsmallest
 
+# key joins of the elementwise engine (see AdvancedCounter._merge)
+INTERSECTION, UNION, LEFT, SHIFT = 'intersection', 'union', 'left', 'shift'
+_positive = partial(lt, 0)
+_absent = object() # the count of keys not in a counter (or snapshot)
+
+_set_class = object.__dict__['__class__'].__set__
+_hooked_classes, _plain_classes = {}, {}
+
+def _hooked(cls):
+    """ The subclass of the counter class cls that hooks into writes (see
+        AdvancedCounter._rehook()). Made once per class, named like it,
+        and telling cls as its __class__, so results, pickles and names
+        stay those of cls.
+    """
+    hooked = _hooked_classes.get(cls)
+    if hooked is None:
+        setitem = cls.__setitem__
+        def __setitem__(self, elem, count):
+            self._note(elem, count)
+            setitem(self, elem, count)
+        __class__ = property(lambda self: cls, _set_class)
+        hooked = type(cls)(cls.__name__, (cls,), dict(__setitem__=__setitem__,
+                           __class__=__class__, __module__=cls.__module__))
+        _hooked_classes[cls], _plain_classes[hooked] = hooked, cls
+    return hooked
+
+def _getter(mapping):
+    """ Fast item lookup for keys known to be in mapping.
+    """
+    if isinstance(mapping, dict):
+        return dict.__getitem__.__get__(mapping)
+    return mapping.__getitem__
+
+
 class AdvancedCounter(dict):
     """ Buffed Counter class. Advanced usefulness to be expected.
     """
     # cache methods for fast lookup
     __getitem__ = dict.__getitem__
-    setdefault = dict.setdefault
-    update = dict.update
+    __setitem__ = dict.__setitem__ # hooked only while needed, see _rehook()
+
+    # number of elements counted in bulk before adding them in
+    __chunksize__ = 1 << 20
+
+    # the elements that may have non-positive counts, or None if any may
+    _suspects = None
+
+    # weak reference to the newest snapshot (see snapshot())
+    _head = None
 
     def __init__(self, iterable=None, **kwds):
         '''Create a new, empty Counter object.  And if given, count elements
@@ -53,20 +100,133 @@ class AdvancedCounter(dict):
         return 0
 
     def __reduce__(self):
-        """ To be dumpable via the pickle module. """
-        return self.__class__, (dict(self),)
+        """ To be dumpable via the pickle module. The items are streamed
+            to pickle, instead of being copied into a dict first.
+        """
+        return self.__class__, (), None, None, self.iteritems()
+
+    def _rehook(self):
+        """ Writes go straight to dict.__setitem__, unless there is
+            bookkeeping to do: noting the elements set to non-positive
+            counts, so stripping them later does not need to look at all
+            counts, or saving old counts for snapshots. Only while there
+            is, the counter is switched to a subclass hooking into writes
+            (see _note()), so plain counters write at full speed.
+        """
+        plain = _plain_classes.get(type(self))
+        if self._suspects is not None or self._head is not None:
+            if plain is None:
+                _set_class(self, _hooked(type(self)))
+        elif plain is not None:
+            _set_class(self, plain)
+
+    def _note(self, elem, count):
+        """ The bookkeeping for setting the count of elem (see _rehook()).
+        """
+        if self._head is not None:
+            self._save(elem)
+        suspects = self._suspects
+        if suspects is not None and not count > 0:
+            suspects.add(elem)
+            if len(suspects) > len(self): # cheaper to look at all
+                self._suspects = None
+                self._rehook()
+
+    def _adder(self):
+        """ The function to write counts with when adding positive counts.
+            These make no new non-positive counts to note, so unless there
+            are snapshots, it is the __setitem__ of the counter's class.
+        """
+        if self._head is not None:
+            return self.__setitem__
+        return self.__class__.__setitem__.__get__(self)
+
+    def update(self, *args, **kwds):
+        """ Like dict.update(). Any count could be non-positive afterwards.
+        """
+        if self._suspects is not None:
+            self._suspects = None
+            self._rehook()
+        if self._head is not None:
+            args, kwds = (dict(*args, **kwds),), {}
+            for elem in args[0]:
+                self._save(elem)
+        dict.update(self, *args, **kwds)
+
+    def setdefault(self, elem, default=None):
+        """ Like dict.setdefault(), noting non-positive defaults.
+        """
+        if elem not in self:
+            self[elem] = default
+        return dict.__getitem__(self, elem)
 
     def __delitem__(self, elem):
         """ Like dict.__delitem__() but does not raise KeyError for missing values.
         """
         if elem in self:
+            if self._head is not None:
+                self._save(elem)
             super(AdvancedCounter, self).__delitem__(elem)
 
+    def pop(self, elem, *default):
+        """ Like dict.pop(), saving the count for snapshots.
+        """
+        if self._head is not None:
+            self._save(elem)
+        return dict.pop(self, elem, *default)
+
+    def popitem(self):
+        """ Like dict.popitem(), saving the count for snapshots.
+        """
+        if self._head is not None:
+            for elem in self:
+                return elem, self.pop(elem)
+        return dict.popitem(self)
+
+    def clear(self):
+        """ Like dict.clear(), saving the counts for snapshots.
+        """
+        if self._head is not None:
+            for elem in self.keys():
+                self._save(elem)
+        dict.clear(self)
+
+    def snapshot(self):
+        """ A read-only view of the counter as it is now, in O(1).
+            Nothing is copied: until a count changes, the snapshot reads
+            it from the counter, and then from the old count the counter
+            saved for it. So the memory taken is that of the changes made
+            while the snapshot is around. Take snapshots in the thread
+            writing to the counter (or holding the writers' lock).
+        """
+        snapshot = CounterSnapshot(self)
+        head = self._head and self._head()
+        if head is not None: # the older ones read through the new one
+            head._newer = snapshot
+        self._head = ref(snapshot)
+        self._rehook()
+        return snapshot
+
+    def _save(self, elem):
+        """ Save the count of elem (if not done already) in the newest
+            snapshot, before it changes.
+        """
+        head = self._head
+        snapshot = head() if head is not None else None
+        if snapshot is None: # no snapshots left
+            self._head = None
+            self._rehook()
+        elif elem not in snapshot._saved:
+            snapshot._saved[elem] = dict.get(self, elem, _absent)
+
     def most_common(self, n=None, count_func=None, inverse=False):
         """ List the n most common elements and their counts from the most
             common to the least.  If n is None, then list all element counts.
             The way counting is done can be customized via the count_func
             argument, that is passed to the sorting as the key function.
+            Each call looks at all items: to read the top n of a counter
+            that keeps changing over and over, use an ExtremeCounter with
+            build_index(), which reads them off its count index.
         """
 
         if count_func is None:
@@ -82,20 +242,42 @@ class AdvancedCounter(dict):
     def most_common_counts(self, n, *args, **kwd):
         """ Get all items with the n highest counts.
             Much like most_common but limit is applied to values (counts).
+            The n count levels are selected first, so only the items
+            making the cut get sorted.
         """
-        def limit_most_common(limit):
-            for elem, count in self.most_common(*args, **kwd):
-                if not "last_count" in locals():
-                    last_count = count
-                else:
+        if n <= 0:
+            return []
+        levels = None
+        if not (args or set(kwd) - set(['inverse'])):
+            try:
+                levels = set(self.itervalues())
+            except TypeError: # unhashable counts
+                pass
+        if levels is None: # custom sorting or odd counts, walk it all
+            def limit_most_common(limit):
+                last_count = _nothing = object()
+                for elem, count in self.most_common(*args, **kwd):
                     if count != last_count:
-                        limit -= 1
+                        if last_count is not _nothing:
+                            limit -= 1
                         last_count = count
-                if limit <= 0:
-                    break
-                yield (elem, count)
-
-        return list(limit_most_common(n)) # don't keep whole list
+                    if limit <= 0:
+                        break
+                    yield (elem, count)
+            return list(limit_most_common(n)) # don't keep whole list
+
+        inverse = kwd.get('inverse', False)
+        if n < len(levels):
+            if inverse:
+                cut = max(nsmallest(n, levels))
+                items = [item for item in self.iteritems() if item[1] <= cut]
+            else:
+                cut = min(nlargest(n, levels))
+                items = [item for item in self.iteritems() if item[1] >= cut]
+        else:
+            items = self.items()
+        items.sort(key=itemgetter(1), reverse=not inverse)
+        return items
 
     def transpose(self):
         """ Use my counts as keys, and as values the list of elements,
@@ -113,6 +295,13 @@ class AdvancedCounter(dict):
         'Return a shallow copy.'
         return self.__class__(self)
 
+    def lazy(self):
+        """ A LazyCounter of this counter, to chain operators on without
+            building the intermediate counters, e.g.
+            ((a.lazy() + b - c) & d | e).evaluate()
+        """
+        return LazyCounter(self)
+
     def __str__(self):
         """ Output like defaultdict or other dict variants.
             Of course AdvancedCounters can be copy-pasted.
@@ -173,65 +362,140 @@ class AdvancedCounter(dict):
         return result
 
 
-    def __add__(self, other):
-        """ Union the keys, add the counts, skip if <= 0.
+    def _merge(self, other, op, join=INTERSECTION, strip=True):
+        """ The elementwise engine behind the binary operators.
+            If other is not a Mapping, op is applied to all counts with other.
+            Otherwise the keys of both sides are aligned once, and op runs over
+            the aligned lists of counts in bulk. The join decides on the keys:
+            INTERSECTION uses the common keys, UNION uses all keys with missing
+            counts as zero, LEFT uses the own keys with missing counts of other
+            as zero. SHIFT is like INTERSECTION, but also copies the own keys
+            missing in other unchanged. Non-positive results of op are stripped
+            if strip is true.
         """
         result = self.__class__()
+        _update = dict.update
         if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count + other
+            _update(result, izip(self.iterkeys(), imap(op, self.itervalues(), repeat(other))))
             return result
-        for elem, count in self.items():
-            newcount = count + other[elem]
-            if newcount > 0:
-                result[elem] = newcount
-        for elem, count in other.items():
-            if elem not in self and count > 0:
-                result[elem] = count
-        return result
 
-    __radd__ = __add__ # commutative
+        self_get, other_get = _getter(self), _getter(other)
+        if join is UNION or join is LEFT:
+            keys = self.keys()
+            counts = map(op, self.values(), map(other.get, keys, repeat(0, len(keys))))
+        elif join is SHIFT:
+            keys = self.keys()
+            inside = map(other.__contains__, keys)
+            rest = list(compress(keys, imap(not_, inside)))
+            keys = list(compress(keys, inside))
+            counts = map(op, map(self_get, keys), map(other_get, keys))
+        else:
+            if len(other) < len(self):
+                keys = other.keys()
+                keys = list(compress(keys, imap(self.__contains__, keys)))
+            else:
+                keys = self.keys()
+                keys = list(compress(keys, imap(other.__contains__, keys)))
+            counts = map(op, map(self_get, keys), map(other_get, keys))
 
-    def __iadd__(self, other):
-        """ Union the keys, add the counts, skip if <= 0.
+        if not strip or (counts and min(counts) > 0):
+            _update(result, izip(keys, counts))
+        else:
+            _update(result, compress(izip(keys, counts), imap(_positive, counts)))
+
+        if join is UNION: # the keys only in other
+            if isinstance(other, dict):
+                keys = list(other.viewkeys() - self.viewkeys())
+            else:
+                keys = [ elem for elem in other if elem not in self ]
+            counts = map(op, repeat(0, len(keys)), map(other_get, keys))
+            _update(result, compress(izip(keys, counts), imap(_positive, counts)))
+        elif join is SHIFT: # the keys only in self
+            _update(result, izip(rest, map(self_get, rest)))
+        if strip and join is not SHIFT: # no non-positive counts left
+            result._suspects = set()
+            result._rehook()
+        return result
+
+    def _imerge(self, other, op, join=INTERSECTION, strip=True):
+        """ The elementwise engine behind the in-place operators, giving the
+            results of _merge() with the same arguments, but changing self.
+            No copy of the own items is made: for the joins leaving the own
+            keys missing in other as they are (UNION up to stripping, and
+            SHIFT), only the keys of other are visited. Stripping the own
+            non-positive counts only looks at the elements that may have
+            them (see _strip()), so c += delta costs about len(delta).
         """
         if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] += other
+            self.update(izip(self.iterkeys(), imap(op, self.itervalues(), repeat(other))))
             return self
-        for elem, count in self.items():
-            newcount = count + other[elem]
-            if newcount > 0:
+        if other is self:
+            other = dict(self)
+
+        get, other_get = self.get, _getter(other)
+        if join is LEFT: # every own count changes
+            self.update(izip(self.iterkeys(), imap(op, self.itervalues(),
+                                                   imap(other.get, self.iterkeys(), repeat(0)))))
+            self._strip()
+            return self
+
+        kept = 0 # own keys in other, still there
+        for elem in other:
+            count = get(elem, _absent)
+            if count is _absent:
+                if join is UNION:
+                    newcount = op(0, other_get(elem))
+                    if newcount > 0:
+                        self[elem] = newcount
+                continue
+            newcount = op(count, other_get(elem))
+            if newcount > 0 or not strip:
                 self[elem] = newcount
+                kept += 1
             else:
                 del self[elem]
-        for elem, count in other.items():
-            if elem not in self and count > 0:
-                self[elem] = count
+        if join is UNION:
+            self._strip()
+        elif join is INTERSECTION and kept < len(self): # own keys not in other
+            for elem in list(ifilterfalse(other.__contains__, self.iterkeys())):
+                del self[elem]
         return self
 
+    def _strip(self):
+        """ Delete the elements with non-positive counts. Once that has been
+            done, only the elements set to non-positive counts since (see
+            __setitem__) are checked, so it costs as much as the changes.
+        """
+        suspects = self._suspects
+        if suspects is None:
+            if self and not min(self.itervalues()) > 0:
+                for elem in list(compress(self.iterkeys(), imap(not_, imap(_positive, self.itervalues())))):
+                    del self[elem]
+            self._suspects = set()
+            self._rehook()
+            return
+        get = self.get
+        for elem in suspects:
+            if not get(elem, 1) > 0:
+                del self[elem]
+        suspects.clear()
+
+    def __add__(self, other):
+        """ Union the keys, add the counts, skip if <= 0.
+        """
+        return self._merge(other, add, UNION)
+
+    __radd__ = __add__ # commutative
+
+    def __iadd__(self, other):
+        """ Union the keys, add the counts, skip if <= 0.
+        """
+        return self._imerge(other, add, UNION)
+
     def __sub__(self, other):
         """ Subtract count, but keep only results with positive counts.
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count - other
-            return result
-        for elem, count in other.items():
-            if elem in self:
-                newcount = self[elem] - count
-                if newcount > 0:
-                    result[elem] = newcount
-            else:
-                if count > 0 or not count:
-                    continue
-                else:
-                    result[elem] = -count
-        for elem, count in self.items():
-            if count > 0 and elem not in other:
-                result[elem] = count
-        return result
+        return self._merge(other, sub, UNION)
 
     def __rsub__(self, other):
         """ Subtraction is not commutative.
@@ -254,28 +518,7 @@ class AdvancedCounter(dict):
     def __isub__(self, other):
         """ Subtract count, but keep only results with positive counts.
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] -= other
-            return self
-        for elem, count in other.items():
-            if elem not in self:
-                if count > 0: # don't compare other than gt 0
-                    del self[elem]
-                elif not count:
-                    pass
-                else:
-                    self[elem] = -count
-            else:
-                newcount = count - other[elem]
-                if newcount > 0:
-                    self[elem] = newcount
-                else:
-                    del self[elem]
-        for elem, count in self.items():
-                if not count > 0:
-                    del self[elem]
-        return self
+        return self._imerge(other, sub, UNION)
 
     def add(self, iterable=None, **kwds):
         '''Like dict.update() but add counts instead of replacing them.
@@ -304,11 +547,10 @@ class AdvancedCounter(dict):
                     for elem, count in iterable.iteritems():
                         self[elem] = self_get(elem, 0) + count
                 else:
-                    super(AdvancedCounter, self).update(iterable) # fast path when counter is empty
-            else:
-                self_get = self.get
-                for elem in iterable:
-                    self[elem] = self_get(elem, 0) + 1
+                    self.update(iterable) # fast path when counter is empty
+            else: # count in bulk, then add once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    fold_tally(self, chunk, tally(chunk), setitem=self._adder())
         if kwds:
             self.add(kwds)
 
@@ -341,31 +583,53 @@ class AdvancedCounter(dict):
             if isinstance(iterable, Mapping):
                 for elem, count in iterable.items():
                     self[elem] = self_get(elem, 0) - count
-            else:
-                for elem in iterable:
-                    self[elem] = self_get(elem, 0) - 1
+            else: # count in bulk, then subtract once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    fold_tally(self, chunk, tally(chunk), -1)
         if kwds:
             self.subtract(kwds)
 
+    def iter_add(self, iterable, batch_size=1 << 14):
+        """ Like add(), but one batch of batch_size elements per step:
+            a generator that yields the number of elements counted so far
+            after each batch, for an event loop (or any caller) to drive.
+            Every batch goes in as a whole, so in between the steps the
+            counter is consistent and most_common() etc. can be read.
+        """
+        done = 0
+        for chunk in iter_chunks(iterable, batch_size):
+            fold_tally(self, chunk, tally(chunk), setitem=self._adder())
+            done += len(chunk)
+            yield done
+
+    def feeder(self, batch_size=1 << 14):
+        """ Coroutine counting the elements sent to it, in batches: send()
+            single elements, and they are counted batch_size at a time.
+            Close it to count what is left over. For push style sources,
+            like callbacks of an event loop. Started already.
+        """
+        def feed():
+            batch = []
+            append = batch.append
+            try:
+                while True:
+                    append((yield))
+                    if len(batch) >= batch_size:
+                        fold_tally(self, batch, tally(batch), setitem=self._adder())
+                        del batch[:]
+            finally:
+                if batch:
+                    fold_tally(self, batch, tally(batch), setitem=self._adder())
+        sink = feed()
+        next(sink)
+        return sink
+
     def __mul__(self, other):
         """ Multiply elementwise on the intersection of keys, if the other is a Mapping,
             otherwise multiply all counts with other (in that order, to allow magic).
             Strip out zero and negative counts only if other is a Mapping.
         """
-        result = self.__class__()
-
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count * other
-            return result
-
-        for elem, count in self.items():
-            if not count or elem not in other:
-                continue
-            newcount = count * other[elem]
-            if newcount > 0:
-                result[elem] = newcount
-        return result
+        return self._merge(other, mul)
 
     __rmul__ = __mul__ # commutative
 
@@ -374,39 +638,14 @@ class AdvancedCounter(dict):
             otherwise multiply all counts with other (in that order, to allow magic).
             Strip out zero and negative counts only if other is a Mapping.
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] *= other
-            return self
-
-        for elem, count in self.items():
-            if count and (elem in other):
-                newcount = count * other[elem]
-                if newcount > 0:
-                    self[elem] = newcount
-                else:
-                    del self[elem]
-        return self
+        return self._imerge(other, mul)
 
     def __div__(self, other):
         """ Divide elementwise on the intersection of keys if other is a Mapping.
             If not, divide all counts with other (in that order, to allow magic).
             Zero or negative counts are only stripped if other is a Mapping.
         """
-        result = self.__class__()
-
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count / other
-            return result
-
-        for elem, count in self.items():
-            if elem not in other:
-                continue
-            newcount = count / other[elem]
-            if newcount > 0:
-                result[elem] = newcount
-        return result
+        return self._merge(other, div)
 
     def __rdiv__(self, other):
         """ Divide elementwise on the intersection of keys if other is a Mapping.
@@ -434,40 +673,14 @@ class AdvancedCounter(dict):
             If not, divide all counts with other (in that order, to allow magic).
             Zero or negative counts are only stripped if other is a Mapping.
         """
-
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] /= other
-            return self
-
-        for elem, count in self.items():
-            if elem in other:
-                newcount = count / other[elem]
-                if newcount > 0:
-                    self[elem] = newcount
-                else:
-                    del self[elem]
-        return self
+        return self._imerge(other, div)
 
     def __floordiv__(self, other):
         """ Floordivide elements on the intersection of keys if other is a Mapping.
             If not, divide all counts with other (in that order, to allow magic).
             Zero or negative counts are only stripped if other is a Mapping.
         """
-        result = self.__class__()
-
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count // other
-            return result
-
-        for elem, count in self.items():
-            if elem not in other:
-                continue
-            newcount = count // other[elem]
-            if newcount > 0:
-                result[elem] = newcount
-        return result
+        return self._merge(other, floordiv)
 
     def __rfloordiv__(self, other):
         """ Floordivide elements on the intersection of keys if other is a Mapping.
@@ -494,39 +707,12 @@ class AdvancedCounter(dict):
             If not, divide all counts with other (in that order, to allow magic).
             Zero or negative counts are only stripped if other is a Mapping.
         """
-
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                self[elem] //= other
-            return self
-
-        for elem, count in self.items():
-            if elem not in other:
-                continue
-            newcount = count // other[elem]
-            if newcount > 0:
-                self[elem] = newcount
-            else:
-                del self[elem]
-        return self
+        return self._imerge(other, floordiv)
 
     def __truediv__(self, other):
         """ Assuming how this works...
         """
-        result = self.__class__()
-
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = float(count) / other
-            return result
-
-        for elem, count in self.items():
-            if elem not in other:
-                continue
-            newcount = float(count) / other[elem]
-            if newcount > 0:
-                result[elem] = newcount
-        return result
+        return self._merge(other, truediv)
 
     def __rtruediv__(self, other):
         """ Not exactly sure how this works...
@@ -549,20 +735,7 @@ class AdvancedCounter(dict):
     def __itruediv__(self, other):
         """ Assuming how this should work...
         """
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                self[elem] = float(count) / other
-            return self
-
-        for elem, count in self.items():
-            if elem not in other:
-                continue
-            newcount = float(count) / other[elem]
-            if newcount > 0:
-                self[elem] = newcount
-            else:
-                del self[elem]
-        return self
+        return self._imerge(other, truediv)
 
     def __pow__(self, other):
         """ Exponentiate elements on own keys (base), if other (exponent) is a Mapping.
@@ -570,16 +743,7 @@ class AdvancedCounter(dict):
             Zero or negative counts are not stripped since they are rarely results
             of exponentiation (and as such probably interesting to keep when they show up).
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count ** other
-            return result
-        for elem, count in self.items():
-            newcount = count ** other[elem]
-            if newcount > 0:
-                result[elem] = newcount
-        return result
+        return self._merge(other, pow, LEFT)
 
     def __rpow__(self, other):
         """ Exponentiate using own elements as exponents.
@@ -601,35 +765,14 @@ class AdvancedCounter(dict):
             Zero or negative counts are not stripped since they are rarely selfs
             of exponentiation (and as such probably interesting to keep when they show up).
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] **= other
-            return self
-        for elem, count in self.items():
-            newcount = count ** other[elem]
-            if newcount > 0:
-                self[elem] = newcount
-            else:
-                del self[elem]
-        return self
+        return self._imerge(other, pow, LEFT)
 
     def __mod__(self, other):
         """ Modulo elementwise on the intersection of keys if other is a Mapping.
             If not, modulo all counts with other (in that order, to allow magic).
             Zero counts are kept (since they make sense in modulo arithmetics).
         """
-        result = self.__class__()
-
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count % other
-            return result
-
-        for elem, count in self.items():
-            if elem in other:
-                newcount = count % other[elem]
-                result[elem] = newcount
-        return result
+        return self._merge(other, mod, strip=False)
 
     def __rmod__(self, other):
         """ Modulo elementwise on the intersection of keys if other is a Mapping.
@@ -655,40 +798,13 @@ class AdvancedCounter(dict):
             If not, modulo all counts with other (in that order, to allow magic).
             Zero counts are kept (since they make sense in modulo arithmetics).
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] %= other
-            return self
-
-        for elem, count in self.items():
-            if elem in other:
-                self[elem] %= other[elem]
-            else:
-                del self[elem]
-        return self
+        return self._imerge(other, mod, strip=False)
 
     def __or__(self, other):
         """ Union is the maximum of value in either of the input counters.
             Calculation needs to be done on the union of keys.
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            _max = max
-            for elem, count in self.items():
-                result[elem] = _max(count, other)
-            return result
-        for elem, count in self.items():
-            if elem in other:
-                other_count = other[elem]
-                newcount = other_count if count < other_count else count
-                if newcount > 0:
-                    result[elem] = newcount
-            elif count > 0:
-                result[elem] = count
-        for elem, count in other.items():
-            if count > 0 and elem not in self:
-                result[elem] = count
-        return result
+        return self._merge(other, max, UNION)
 
     __ror__ = __or__
 
@@ -696,47 +812,14 @@ class AdvancedCounter(dict):
         """ Union is the maximum of value in either of the input counters.
             Calculation needs to be done on the union of keys.
         """
-        if not isinstance(other, Mapping):
-            _max = max
-            for elem, count in self.items():
-                self[elem] = _max(count, other)
-            return self
-        for elem, count in other.items():
-            if elem not in self:
-                if count > 0:
-                    self[elem] = count
-            else:
-                self_count = self[elem]
-                if count > self_count:
-                    self[elem] = count
-                elif self_count > 0:
-                    pass
-                else:
-                    del self[elem]
-        for elem, count in self.items():
-            if count <= 0: #and elem not in other: <- we just made that sure
-                del self[elem]
-        return self
+        return self._imerge(other, max, UNION)
 
     def __and__(self, other):
         """ Intersection is the minimum of corresponding counts.
             Calculation is only done on the intersection of keys
             if the other is a mapping.
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            _min = min
-            for elem, count in self.items():
-                result[elem] = _min(count, other)
-            return result
-
-        for elem, count in self.items():
-            if elem in other:
-                other_count = other[elem]
-                newcount = count if count < other_count else other_count
-                if newcount > 0:
-                    result[elem] = newcount
-        return result
+        return self._merge(other, min)
 
     __rand__ = __and__
 
@@ -745,26 +828,7 @@ class AdvancedCounter(dict):
             Calculation is only done on the intersection of keys
             if the other is a mapping.
         """
-        if not isinstance(other, Mapping):
-            _min = min
-            for elem, count in self.items():
-                self[elem] = _min(count, other)
-            return self
-
-        for elem, count in self.items():
-            if elem in other:
-                other_count = other[elem]
-                if not other_count > 0:
-                    del self[elem]
-                elif other_count < count:
-                    self[elem] = other_count
-                elif not count > 0:
-                    del self[elem]
-                else: # count is correct
-                    pass
-            elif not count > 0:
-                del self[elem]
-        return self
+        return self._imerge(other, min)
 
     def __xor__(self, other):
         """ Elementwise xor with stripping on both key sets
@@ -775,23 +839,7 @@ class AdvancedCounter(dict):
             so the fastest and savest way to archieve same
             beaviour is copying the methond to __rxor__.
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count ^ other
-            return result
-
-        for elem, count in self.items():
-            if elem in other:
-                newcount = count ^ other[elem]
-                if newcount > 0:
-                    result[elem] = newcount
-            elif count > 0:
-                result[elem] = count
-        for elem, count in other.items():
-            if elem not in self and count > 0:
-                result[elem] = count
-        return result
+        return self._merge(other, xor, UNION)
 
     __rxor__ = __xor__
 
@@ -804,40 +852,13 @@ class AdvancedCounter(dict):
             so the fastest and savest way to archieve same
             beaviour is copying the methond to __rxor__.
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] ^= other
-            return self
-
-        for elem, count in other.items():
-            if elem in self:
-                newcount = self[elem] ^ count
-                if newcount > 0:
-                    self[elem] = newcount
-                else:
-                    del self[elem]
-        for elem, count in self.items():
-            if count < 0:# and elem not in other:
-                del self[elem]
-        return self
+        return self._imerge(other, xor, UNION)
 
     def __rshift__(self, other):
         """ Shift own keys by the value of other's key if other is a Mapping
             throwing out non-positives. Don't throw out, if other is not a mapping.
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count >> other
-            return result
-        for elem, count in self.items():
-            if elem not in other:
-                result[elem] = count
-            else:
-                newcount = count >> other[elem]
-                if newcount > 0:
-                    result[elem] = newcount
-        return result
+        return self._merge(other, rshift, SHIFT)
 
     def __rrshift__(self, other):
         """ Shift own keys by the value of other's key if other is a Mapping
@@ -862,38 +883,13 @@ class AdvancedCounter(dict):
         """ Shift own keys by the value of other's key if other is a Mapping
             throwing out non-positives. Don't throw out, if other is not a mapping.
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] >>= other
-            return self
-        for elem, count in self.items():
-            if elem not in other:
-                self[elem] = count
-            else:
-                newcount = count >> other[elem]
-                if newcount > 0:
-                    self[elem] = newcount
-                else:
-                    del self[elem]
-        return self
+        return self._imerge(other, rshift, SHIFT)
 
     def __lshift__(self, other):
         """ Shift own keys by the value of other's key if other is a Mapping
             throwing out non-positives. Don't throw out, if other is not a mapping.
         """
-        result = self.__class__()
-        if not isinstance(other, Mapping):
-            for elem, count in self.items():
-                result[elem] = count << other
-            return result
-        for elem, count in self.items():
-            if elem not in other:
-                result[elem] = count
-            else:
-                newcount = count << other[elem]
-                if newcount > 0:
-                    result[elem] = newcount
-        return result
+        return self._merge(other, lshift, SHIFT)
 
     def __rlshift__(self, other):
         """ Shift own keys by the value of other's key if other is a Mapping
@@ -918,17 +914,294 @@ class AdvancedCounter(dict):
         """ Shift own keys by the value of other's key if other is a Mapping
             throwing out non-positives. Don't throw out, if other is not a mapping.
         """
-        if not isinstance(other, Mapping):
-            for elem in self.keys():
-                self[elem] <<= other
-            return self
-        for elem, count in self.items():
-            if elem not in other:
-                self[elem] = count
+        return self._imerge(other, lshift, SHIFT)
+
+
+# operators LazyCounter writes inline, rather than calling them
+_infix = {add: '+', sub: '-', mul: '*', div: '/', floordiv: '//', mod: '%',
+          pow: '**', xor: '^', rshift: '>>', lshift: '<<'}
+
+
+def _keeps_zero(op, other):
+    """ Whether op(0, other) is 0 (and not an error).
+    """
+    try:
+        return op(0, other) == 0
+    except Exception:
+        return False
+
+
+class LazyCounter(object):
+    """ A chain of counter operators, recorded instead of computed. It is
+        made by AdvancedCounter.lazy(), and takes the binary operators with
+        Mappings and scalars on the right hand side. evaluate() computes the
+        result in one pass over the keys, key by key through the whole
+        chain, without building the intermediate counters: the chain is
+        compiled into one function, with the operators written inline.
+
+        The results are those of the eager operators: with a Mapping, each
+        operator strips like its AdvancedCounter counterpart and uses the
+        same keys (all of both sides for + - | ^, the common ones for * / &
+        and the like, the left ones for ** >> <<), and with a scalar, it
+        applies to all counts without stripping.
+    """
+
+    def __init__(self, counter, op=None, other=None, join=None, strip=True):
+        """ A leaf holding counter, or the node op(counter, other), where
+            join and strip are like in AdvancedCounter._merge(), and join is
+            None if other is a scalar.
+        """
+        self.counter, self.op, self.other = counter, op, other
+        self.join, self.strip = join, strip
+
+    def _chain(self, other, op, join=INTERSECTION, strip=True):
+        if isinstance(other, Mapping):
+            other = LazyCounter(other)
+        elif not isinstance(other, LazyCounter):
+            join = None
+        return LazyCounter(self, op, other, join, strip)
+
+    def __add__(self, other):
+        return self._chain(other, add, UNION)
+
+    def __sub__(self, other):
+        return self._chain(other, sub, UNION)
+
+    def __mul__(self, other):
+        return self._chain(other, mul)
+
+    def __div__(self, other):
+        return self._chain(other, div)
+
+    def __floordiv__(self, other):
+        return self._chain(other, floordiv)
+
+    def __truediv__(self, other):
+        return self._chain(other, truediv)
+
+    def __pow__(self, other):
+        return self._chain(other, pow, LEFT)
+
+    def __mod__(self, other):
+        return self._chain(other, mod, strip=False)
+
+    def __or__(self, other):
+        return self._chain(other, max, UNION)
+
+    def __and__(self, other):
+        return self._chain(other, min)
+
+    def __xor__(self, other):
+        return self._chain(other, xor, UNION)
+
+    def __rshift__(self, other):
+        return self._chain(other, rshift, SHIFT)
+
+    def __lshift__(self, other):
+        return self._chain(other, lshift, SHIFT)
+
+    # commutative with scalars
+    __radd__, __rmul__, __ror__, __rand__, __rxor__ = __add__, __mul__, __or__, __and__, __xor__
+
+    def _cls(self):
+        """ The class of the leftmost counter, as with the eager operators.
+        """
+        node = self
+        while node.op is not None:
+            node = node.counter
+        cls = node.counter.__class__
+        return cls if issubclass(cls, AdvancedCounter) else AdvancedCounter
+
+    def _sources(self):
+        """ The counters whose keys cover the keys of the result.
+        """
+        if self.op is None:
+            return [self.counter]
+        sources = self.counter._sources()
+        if self.join is UNION:
+            return sources + self.other._sources()
+        elif self.join is INTERSECTION:
+            other = self.other._sources()
+            if sum(map(len, other)) < sum(map(len, sources)):
+                return other
+        return sources
+
+    def _emit(self, lines, names, indent, absent='A'):
+        """ Append the source lines computing the count of key in this node
+            to lines, indented by indent, binding the counters, operators
+            and scalars used in names. Returns the variable holding the
+            count, which is absent (A, for _absent, or 0) if the key is not
+            in the result. The sides of a union ask for 0: all the union
+            operators take it like a missing key, and give 0 for two of
+            them, which gets stripped. The right side of the other joins
+            is only looked up when it matters.
+        """
+        var = 'v%d' % len(names)
+        pad = '    ' * indent
+        if self.op is None:
+            counter = self.counter
+            if isinstance(counter, dict): # no __missing__ on the way
+                names[var + 'get'] = dict.get.__get__(counter)
+                lines.append('%s%s = %sget(key, %s)' % (pad, var, var, absent))
             else:
-                newcount = count << other[elem]
-                if newcount > 0:
-                    self[elem] = newcount
-                else:
-                    del self[elem]
-        return self
+                names[var + 'in'], names[var + 'get'] = counter.__contains__, counter.__getitem__
+                lines.append('%s%s = %sget(key) if %sin(key) else %s' % (pad, var, var, var, absent))
+            return var
+
+        op = names[var + 'op'] = self.op
+        if op in _infix:
+            apply = lambda x, y: '%s %s %s' % (x, _infix[op], y)
+        else:
+            apply = lambda x, y: '%sop(%s, %s)' % (var, x, y)
+        def assign(depth, value, strip=self.strip):
+            pad = '    ' * depth
+            lines.append('%s%s = %s' % (pad, var, value))
+            if strip:
+                lines.extend(['%sif not %s > 0:' % (pad, var), '%s    %s = %s' % (pad, var, absent)])
+
+        join = self.join
+        if join is None: # a scalar
+            names[var + 'x'] = self.other
+            if absent == '0' and _keeps_zero(op, self.other): # like 0 * 2, no check needed
+                lines.append('%s%s = %s' % (pad, var, apply(self.counter._emit(lines, names, indent, '0'), var + 'x')))
+                return var
+            left = self.counter._emit(lines, names, indent)
+            lines.append('%s%s = %s if %s is A else %s' % (pad, var, absent, left, apply(left, var + 'x')))
+            return var
+        left = self.counter._emit(lines, names, indent, '0' if join is UNION else 'A')
+        if join is UNION:
+            assign(indent, apply(left, self.other._emit(lines, names, indent, '0')))
+            return var
+        lines += ['%sif %s is A:' % (pad, left),
+                  '%s    %s = %s' % (pad, var, absent),
+                  '%selse:' % pad]
+        if join is LEFT:
+            assign(indent + 1, apply(left, self.other._emit(lines, names, indent + 1, '0')))
+            return var
+        right = self.other._emit(lines, names, indent + 1)
+        lines += ['%s    if %s is A:' % (pad, right),
+                  '%s        %s = %s' % (pad, var, left if join is SHIFT else absent),
+                  '%s    else:' % pad]
+        assign(indent + 2, apply(left, right), self.strip or join is SHIFT)
+        return var
+
+    def _compile(self):
+        """ The whole chain as one generated function, fill(result, keys),
+            setting the counts of the keys that are in the result. Like
+            that, each key costs one call of dict.get() per counter and
+            the operators, with no function call per node, or per key.
+        """
+        names = {'A': _absent, 'setitem': dict.__setitem__}
+        lines = []
+        var = self._emit(lines, names, 2)
+        local = ''.join(', %s=%s' % (name, name) for name in sorted(names)) # fast lookups
+        source = '\n'.join(['def fill(result, keys%s):' % local,
+                              '    for key in keys:'] + lines + [
+                              '        if %s is not A:' % var,
+                              '            setitem(result, key, %s)' % var])
+        exec compile(source, '<LazyCounter>', 'exec', 0, True) in names
+        return names['fill']
+
+    def evaluate(self, cls=None):
+        """ Compute the result, as a new counter of class cls (default:
+            the class of the leftmost counter).
+        """
+        result = (cls or self._cls())()
+        sources = []
+        for source in self._sources():
+            if not any(source is seen for seen in sources):
+                sources.append(source)
+        first, others = sources[0], sources[1:]
+        if len(others) > 1: # each key once
+            others = [ set(others[0]).union(*others[1:]) ]
+        keys = chain(first, *[ ifilterfalse(first.__contains__, keys) for keys in others ])
+        self._compile()(result, keys)
+        return result
+
+    def __repr__(self):
+        if self.op is None:
+            return 'LazyCounter(%r)' % (self.counter,)
+        return 'LazyCounter(%r, %s, %r)' % (self.counter, getattr(self.op, '__name__', self.op), self.other)
+
+
+_unsaved = object()
+
+class CounterSnapshot(Mapping):
+    """ A frozen view of an AdvancedCounter, made by its snapshot() method.
+        It shares the counts with the counter: the counter saves a count
+        in the snapshot just before changing it, and the snapshot reads
+        the saved count if there is one, and the counter's otherwise.
+        Older snapshots read through newer ones, so each change is saved
+        only once, however many snapshots there are.
+
+        Like with counters, elements not counted have a count of zero.
+    """
+
+    def __init__(self, counter):
+        self._counter = counter
+        self._newer = counter # the counter, or the next newer snapshot
+        self._saved = {} # counts changed since, as they were (or _absent)
+
+    def _get(self, elem):
+        node = self
+        while node is not self._counter:
+            count = node._saved.get(elem, _unsaved)
+            if count is not _unsaved:
+                return count
+            node = node._newer
+        return dict.get(node, elem, _absent)
+
+    def __getitem__(self, elem):
+        count = self._get(elem)
+        return 0 if count is _absent else count
+
+    def get(self, elem, default=None):
+        count = self._get(elem)
+        return default if count is _absent else count
+
+    def __contains__(self, elem):
+        return self._get(elem) is not _absent
+
+    def __iter__(self):
+        """ Iterates over the elements as they are when called, so writing
+            to the counter meanwhile neither skips nor repeats any.
+        """
+        saved = self._saved
+        elems = list(ifilterfalse(saved.__contains__, self._newer))
+        elems.extend(elem for elem, count in saved.iteritems() if count is not _absent)
+        return iter(elems)
+
+    def __len__(self):
+        size, newer = len(self._newer), self._newer
+        for elem, count in self._saved.items():
+            if count is _absent:
+                size -= elem in newer
+            else:
+                size += elem not in newer
+        return size
+
+    def iteritems(self):
+        get = self._get
+        return ( (elem, get(elem)) for elem in self )
+
+    def most_common(self, n=None, inverse=False):
+        """ Like AdvancedCounter.most_common().
+        """
+        if n is None:
+            return sorted(self.iteritems(), key=itemgetter(1), reverse=not inverse)
+        if inverse:
+            return nsmallest(n, self.iteritems(), key=itemgetter(1))
+        return nlargest(n, self.iteritems(), key=itemgetter(1))
+
+    def elements(self):
+        """ Like AdvancedCounter.elements().
+        """
+        return chain.from_iterable(starmap(repeat, self.iteritems()))
+
+    def to_counter(self, cls=None):
+        """ Copy into a counter of class cls (default: the counter's).
+        """
+        return (cls or self._counter.__class__)(dict(self.iteritems()))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.iteritems()))
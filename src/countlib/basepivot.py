@@ -23,6 +23,7 @@ class PivotCounterBase(dict):
     """
 
     __unpivot__ = Counter
+    __chunksize__ = 1 << 20
 
     def __init__(self, iterable=None, **kwds):
         """ Create a new, empty PivotCounter object. And if given, count elements
@@ -0,0 +1,116 @@
+""" Counters to share between threads. """
+from itertools import chain, repeat
+from operator import add, sub
+from threading import Lock
+from acount import AdvancedCounter
+from sharded import ShardedCounter
+
+
+class ConcurrentCounter(ShardedCounter):
+    """ A ShardedCounter that can be written from many threads at once.
+        Every shard has its own lock (lock striping), so threads only wait
+        for each other when they touch the same shard at the same time.
+
+        add() and subtract() tally their input first, without holding any
+        lock, and then fold the counts into each shard under its lock, so
+        a lock is held once per shard and call instead of once per element.
+        Use increment() for single elements: self[elem] += 1 is a read and
+        a write, and updates of other threads can get lost between them.
+
+        Iteration works on a snapshot of each shard, taken under its lock.
+    """
+
+    def __init__(self, iterable=None, shards=32, mapper=map, cls=AdvancedCounter, **kwds):
+        """ Create a new, empty ConcurrentCounter with the given number of
+            shards (and locks). And if given, count elements from an input
+            iterable. Or, add in the counts of another mapping.
+        """
+        self.locks = [ Lock() for _ in xrange(shards) ]
+        ShardedCounter.__init__(self, iterable, shards, mapper, cls, **kwds)
+
+    def _map(self, func, *iterables):
+        """ Like ShardedCounter._map(), but holding each shard's lock.
+        """
+        def locked(lock, *args):
+            with lock:
+                return func(*args)
+        return ShardedCounter._map(self, locked, self.locks, *iterables)
+
+    def _aligned(self, other):
+        """ Like ShardedCounter._aligned(), copying other's shards under
+            their locks if other is concurrent as well.
+        """
+        if isinstance(other, ConcurrentCounter):
+            other = other.copy()
+        return ShardedCounter._aligned(self, other)
+
+    def lock(self, elem):
+        """ The lock of the shard elem belongs in.
+        """
+        return self.locks[self.shard_of(elem)]
+
+    def increment(self, elem, count=1):
+        """ Add count to the count of elem, atomically. Returns the new count.
+        """
+        i = self.shard_of(elem)
+        shard = self.shards[i]
+        with self.locks[i]:
+            shard[elem] = newcount = shard.get(elem, 0) + count
+        return newcount
+
+    def __setitem__(self, elem, count):
+        with self.lock(elem):
+            ShardedCounter.__setitem__(self, elem, count)
+
+    def __delitem__(self, elem):
+        with self.lock(elem):
+            ShardedCounter.__delitem__(self, elem)
+
+    def pop(self, elem, *default):
+        with self.lock(elem):
+            return ShardedCounter.pop(self, elem, *default)
+
+    def setdefault(self, elem, default=None):
+        with self.lock(elem):
+            return ShardedCounter.setdefault(self, elem, default)
+
+    def _snapshot(self, method):
+        """ Iterator over the results of calling method on each shard
+            under its lock, e.g. the items of all shards.
+        """
+        return chain.from_iterable(self._map(method, self.shards))
+
+    def __iter__(self):
+        return self._snapshot(self.cls.keys)
+
+    def iteritems(self):
+        return self._snapshot(self.cls.items)
+
+    def elements(self):
+        """ Like AdvancedCounter.elements(), on a snapshot.
+        """
+        return self._snapshot(lambda shard: list(shard.elements()))
+
+    def clear(self):
+        self._map(self.cls.clear, self.shards)
+
+    def _inplace(self, other, op):
+        """ Set each shard to op of it and the matching counts of other,
+            under the shard's lock. The shards stay the same objects, so
+            writers holding on to one do not lose their updates.
+        """
+        others = self._aligned(other)
+        if others is None:
+            others = repeat(other)
+        def replace(shard, part):
+            result = op(shard, part)
+            shard.clear()
+            shard.update(result)
+        self._map(replace, self.shards, others)
+        return self
+
+    def __iadd__(self, other):
+        return self._inplace(other, add)
+
+    def __isub__(self, other):
+        return self._inplace(other, sub)
@@ -0,0 +1,94 @@
+""" Counters as columns of keys and counts, in numpy arrays. """
+from itertools import chain, izip
+from acount import AdvancedCounter
+from basepivot import PivotCounterBase
+from pivot import CoolPivotCounter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# numpy types of columns of plain values. Not str and unicode: numpy strips
+# their trailing NULs, so those stay objects.
+_int_types = frozenset([int]), frozenset([long]), frozenset([int, long])
+_column_types = dict.fromkeys(_int_types, 'int64')
+_column_types.update({frozenset([bool]): 'bool', frozenset([float]): 'float64'})
+
+
+def _column(values):
+    """ A numpy array of a list of values: of a numpy type if all values are
+        of one plain type (ints, floats, bools) that fits, else of objects.
+    """
+    dtype = _column_types.get(frozenset(map(type, values)))
+    if dtype is not None:
+        try:
+            return numpy.array(values, dtype=dtype)
+        except OverflowError: # ints beyond 64 bit
+            pass
+    column = numpy.empty(len(values), dtype=object)
+    for i, value in enumerate(values): # no broadcasting of tuples into rows
+        column[i] = value
+    return column
+
+def to_columns(counter):
+    """ Two numpy arrays, of the keys and the counts of counter. For pivot
+        tables, the keys are the elements of all sets, and the counts their
+        count, repeated. Counts that are all ints are read straight into an
+        int64 array, without building a tuple (or list) per item.
+    """
+    if numpy is None:
+        raise ImportError("columns need numpy")
+    if isinstance(counter, PivotCounterBase):
+        keys = _column(list(chain.from_iterable(counter.itervalues())))
+        sizes = numpy.fromiter(map(len, counter.itervalues()), numpy.int64, len(counter))
+        counts = numpy.repeat(_column(counter.keys()), sizes)
+        return keys, counts
+    counts = None
+    if frozenset(map(type, counter.itervalues())) in _int_types:
+        try:
+            counts = numpy.fromiter(counter.itervalues(), numpy.int64, len(counter))
+        except OverflowError: # ints beyond 64 bit
+            pass
+    if counts is None:
+        counts = _column(counter.values())
+    return _column(counter.keys()), counts
+
+def from_columns(keys, counts, cls=AdvancedCounter):
+    """ A counter of class cls from columns of keys and counts, e.g. numpy
+        arrays or lists. The columns are converted to Python values in one go
+        and the counter is filled by dict.update(). Pivot table classes get
+        their sets grouped by count.
+    """
+    if hasattr(keys, 'tolist'):
+        keys = keys.tolist()
+    if hasattr(counts, 'tolist'):
+        counts = counts.tolist()
+    result = cls()
+    if issubclass(cls, PivotCounterBase):
+        buckets = {}
+        buckets_sdf = buckets.setdefault
+        for elem, count in izip(keys, counts):
+            buckets_sdf(count, set()).add(elem)
+        if issubclass(cls, CoolPivotCounter):
+            buckets = dict((count, frozenset(elems)) for count, elems in buckets.iteritems())
+        dict.update(result, buckets)
+    else:
+        dict.update(result, izip(keys, counts))
+    return result
+
+def to_records(counter):
+    """ A numpy structured array with the fields key and count. If both
+        are of numpy types (numbers, not objects like str keys), its buffer
+        can be handed on (e.g. numpy.save, or shared memory) as one block.
+    """
+    keys, counts = to_columns(counter)
+    records = numpy.empty(len(keys), dtype=[('key', keys.dtype), ('count', counts.dtype)])
+    records['key'] = keys
+    records['count'] = counts
+    return records
+
+def from_records(records, cls=AdvancedCounter):
+    """ A counter of class cls from a structured array made by to_records().
+    """
+    return from_columns(records['key'], records['count'], cls)
@@ -0,0 +1,112 @@
+""" Sorted count index. """
+
+from bisect import bisect_left, insort
+from itertools import islice
+from pivot import PivotCounter
+
+
+class CountIndex(PivotCounter):
+    """ A PivotCounter that keeps its counts (the keys) in a sorted list,
+        so ranges of counts can be found by bisection instead of a scan.
+        It is meant to be kept up to date by the counter it indexes, one
+        element at a time, via insert(), discard() and move().
+
+        Counts have to be hashable and orderable to be indexed.
+    """
+
+    def __init__(self, iterable=None, **kwds):
+        """ Create a new CountIndex. And if given, index the elements
+            of an input Counter or dict.
+        """
+        self.counts = []
+        PivotCounter.__init__(self, iterable, **kwds)
+
+    def update(self, iterable=None, **kwds):
+        """ Like PivotCounter.update() but also resorts the counts.
+        """
+        PivotCounter.update(self, iterable, **kwds)
+        self.counts = sorted(self)
+
+    def __missing__(self, key):
+        """ Return an empty set if asked for a missing count, but don't store it.
+            An empty bucket in the index would be a count without elements.
+        """
+        return frozenset()
+
+    def clear(self):
+        """ Like dict.clear() but also forgets the sorted counts.
+        """
+        dict.clear(self)
+        del self.counts[:]
+
+    def insert(self, elem, count):
+        """ Put elem into the bucket of count.
+        """
+        bucket = self.get(count)
+        if bucket is None:
+            dict.__setitem__(self, count, set([elem]))
+            insort(self.counts, count)
+        else:
+            bucket.add(elem)
+
+    def discard(self, elem, count):
+        """ Take elem out of the bucket of count, if it is there.
+            Buckets that run empty are dropped.
+        """
+        bucket = self.get(count)
+        if bucket is None:
+            return
+        bucket.discard(elem)
+        if not bucket:
+            dict.__delitem__(self, count)
+            counts = self.counts
+            del counts[bisect_left(counts, count)]
+
+    def move(self, elem, old, new):
+        """ Move elem from the bucket of count old to the one of count new.
+            The new bucket is filled first, so an unhashable count leaves
+            the index untouched.
+        """
+        if old == new:
+            return
+        self.insert(elem, new)
+        self.discard(elem, old)
+
+    def bounds(self, start=None, stop=None):
+        """ The positions in self.counts of the counts c with start <= c < stop.
+            Either bound can be None, which means it is open.
+        """
+        counts = self.counts
+        lo = 0 if start is None else bisect_left(counts, start)
+        hi = len(counts) if stop is None else bisect_left(counts, stop)
+        return lo, max(lo, hi)
+
+    def count_range(self, start=None, stop=None, invert=False):
+        """ List the counts c with start <= c < stop in ascending order.
+            If invert is true, list all other counts instead.
+        """
+        lo, hi = self.bounds(start, stop)
+        if invert:
+            return self.counts[:lo] + self.counts[hi:]
+        return self.counts[lo:hi]
+
+    def iter_range(self, start=None, stop=None, invert=False):
+        """ Iterator over the (element, count) pairs with start <= count < stop,
+            ascending by count. If invert is true, iterate over all others.
+        """
+        for count in self.count_range(start, stop, invert):
+            for elem in self[count]:
+                yield (elem, count)
+
+    def top(self, n=None, lowest=False):
+        """ List the n (element, count) pairs with the highest counts, from
+            the highest down (or with the lowest, up). Only the buckets making
+            the cut are visited. Ties are listed in no particular order.
+        """
+        if n is not None and n <= 0:
+            return []
+        def iter_sorted():
+            for count in (self.counts if lowest else reversed(self.counts)):
+                for elem in self[count]:
+                    yield (elem, count)
+        return list(islice(iter_sorted(), n))
@@ -0,0 +1,321 @@
+""" Counters for small integers, kept in arrays. """
+from collections import Mapping
+from numbers import Integral
+from acount import AdvancedCounter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class DenseCounter(Mapping):
+    """ Counter for small non-negative integers (histogram bins, status codes,
+        bytes...). The counts live in a numpy array indexed by the counted
+        element, so all arithmetic runs vectorized.
+
+        The operators follow AdvancedCounter: with another Mapping, + - * / //
+        & and | strip non-positive results, & and | being min and max.
+        With a scalar, the operation is broadcast to all counted elements
+        and nothing is stripped.
+
+        Other than with AdvancedCounter, a zero count and a missing element
+        are the same thing here, so zero results always vanish. Counts are
+        bound to the array dtype (int64 by default) and can overflow. Adding
+        in counts of another kind (like floats into ints) promotes it.
+    """
+
+    def __init__(self, iterable=None, size=0, dtype=None):
+        """ Create a new, empty DenseCounter with room for size elements.
+            And if given, count elements from an input iterable. Or,
+            initialize the count from another mapping of elements to counts.
+        """
+        if numpy is None:
+            raise ImportError("DenseCounter needs numpy")
+        self.counts = numpy.zeros(size, dtype=dtype or numpy.int64)
+        self.add(iterable)
+
+    @classmethod
+    def fromarray(cls, counts):
+        """ Wrap an array of counts (indexed by element) without copying it.
+        """
+        new = cls()
+        new.counts = numpy.asarray(counts)
+        return new
+
+    def _grow(self, size):
+        """ Make room for the elements up to size - 1.
+        """
+        counts = self.counts
+        if size > len(counts):
+            grown = numpy.zeros(size, dtype=counts.dtype)
+            grown[:len(counts)] = counts
+            self.counts = grown
+
+    def _as_array(self, other):
+        """ The counts of a Mapping (or the tally of the elements of an
+            iterable) as an array indexed by element. The counts of a
+            Mapping keep their numeric type.
+        """
+        if isinstance(other, DenseCounter):
+            return other.counts
+        if isinstance(other, Mapping):
+            if not other:
+                return numpy.zeros(0, self.counts.dtype)
+            elems = numpy.fromiter(other.iterkeys(), numpy.int64, len(other))
+            if elems.min() < 0:
+                raise ValueError("DenseCounter cannot count negative elements")
+            values = numpy.array([ other[elem] for elem in elems.tolist() ])
+            if values.dtype.kind not in 'biuf':
+                raise TypeError("DenseCounter only counts with numbers")
+            counts = numpy.zeros(elems.max() + 1, values.dtype)
+            counts[elems] = values
+            return counts
+        if not isinstance(other, (list, tuple, numpy.ndarray)):
+            other = list(other) # also no 0-d array of a string
+        elems = numpy.asarray(other)
+        if not len(elems):
+            return numpy.zeros(0, self.counts.dtype)
+        if elems.dtype.kind not in 'iub':
+            raise TypeError("DenseCounter only counts integers")
+        return numpy.bincount(elems.astype(numpy.intp))
+
+    def _add_array(self, other, sign=1):
+        """ Add (or subtract) an array of counts indexed by element, promoting
+            the dtype if the other counts are of another kind.
+        """
+        self._grow(len(other))
+        if not numpy.can_cast(other.dtype, self.counts.dtype, 'same_kind'):
+            self.counts = self.counts.astype(numpy.result_type(self.counts, other))
+        if sign > 0:
+            self.counts[:len(other)] += other
+        else:
+            self.counts[:len(other)] -= other
+
+    def _new(self, counts):
+        return self.__class__.fromarray(counts)
+
+    def __getitem__(self, elem):
+        """ The count of elem. Elements not counted (or out of range) are zero.
+        """
+        if isinstance(elem, Integral) and 0 <= elem < len(self.counts):
+            return self.counts[elem].item()
+        return 0
+
+    def __setitem__(self, elem, count):
+        if not isinstance(elem, Integral):
+            raise TypeError("DenseCounter only counts integers, not %r" % (elem,))
+        if elem < 0:
+            raise ValueError("DenseCounter cannot count negative %r" % (elem,))
+        self._grow(elem + 1)
+        self.counts[elem] = count
+
+    def __delitem__(self, elem):
+        """ Like dict.__delitem__() but does not raise KeyError for missing values.
+        """
+        if elem in self:
+            self.counts[elem] = 0
+
+    def __contains__(self, elem):
+        return self[elem] != 0
+
+    def get(self, elem, default=None):
+        return self[elem] if elem in self else default
+
+    def __iter__(self):
+        return iter(numpy.flatnonzero(self.counts).tolist())
+
+    def __len__(self):
+        return int(numpy.count_nonzero(self.counts))
+
+    def iteritems(self):
+        counts = self.counts
+        elems = numpy.flatnonzero(counts)
+        return iter(zip(elems.tolist(), counts[elems].tolist()))
+
+    def items(self):
+        return list(self.iteritems())
+
+    def __repr__(self):
+        """ Output like AdvancedCounter, so DenseCounters can be copy-pasted.
+        """
+        if not self:
+            return '%s()' % self.__class__.__name__
+        items = ', '.join(map('%r: %r'.__mod__, self.iteritems()))
+        return '%s({%s})' % (self.__class__.__name__, items)
+
+    def copy(self):
+        return self._new(self.counts.copy())
+
+    def add(self, iterable=None):
+        """ Like AdvancedCounter.add(), counting elements of an iterable
+            or adding in the counts of a Mapping (zeros are dropped).
+        """
+        if iterable is not None:
+            self._add_array(self._as_array(iterable))
+
+    def subtract(self, iterable=None):
+        """ Like AdvancedCounter.subtract(). Counts can be reduced below zero.
+        """
+        if iterable is not None:
+            self._add_array(self._as_array(iterable), -1)
+
+    def elements(self):
+        """ Iterator over elements repeating each as many times as its count.
+            Elements with zero or negative counts are ignored.
+        """
+        counts = self.counts
+        return iter(numpy.repeat(numpy.arange(len(counts)), counts.clip(0)).tolist())
+
+    def most_common(self, n=None):
+        """ List the n most common elements and their counts from the most
+            common to the least.  If n is None, then list all element counts.
+            Ties are listed by element.
+        """
+        counts = self.counts
+        elems = numpy.flatnonzero(counts)
+        if n is not None and n < len(elems):
+            if n <= 0:
+                return []
+            top = numpy.argpartition(counts[elems], len(elems) - n)[len(elems) - n:]
+            elems = numpy.sort(elems[top])
+        # a stable descending sort, without negating (unsigned) counts
+        order = numpy.argsort(counts[elems][::-1], kind='mergesort')[::-1]
+        elems = elems[::-1][order]
+        return zip(elems.tolist(), counts[elems].tolist())
+
+    def to_counter(self, cls=AdvancedCounter):
+        """ Convert to a dict based counter.
+        """
+        return cls(dict(self.iteritems()))
+
+    def _binop(self, other, op, strip=True):
+        """ Apply op elementwise. With a scalar, op is broadcast to all counted
+            elements. With a Mapping, both arrays are aligned first and the
+            non-positive results are stripped if strip is true.
+        """
+        counts = self.counts
+        if not isinstance(other, Mapping):
+            result = op(counts, other)
+            result[counts == 0] = 0
+            return self._new(result)
+        other = self._as_array(other)
+        size = max(len(counts), len(other))
+        if len(counts) < size:
+            counts = numpy.concatenate((counts, numpy.zeros(size - len(counts), counts.dtype)))
+        if len(other) < size:
+            other = numpy.concatenate((other, numpy.zeros(size - len(other), other.dtype)))
+        result = op(counts, other)
+        if strip:
+            result[result < 0] = 0
+        return self._new(result)
+
+    def __neg__(self):
+        """ Negate all counts. Don't strip any.
+        """
+        return self._new(-self.counts)
+
+    def __pos__(self):
+        """ Positive of all counts. Negative and zero outcomes are stripped.
+        """
+        return self._new(self.counts.clip(0))
+
+    def __abs__(self):
+        """ Absolute of all counts. None are stripped.
+        """
+        return self._new(numpy.abs(self.counts))
+
+    def __add__(self, other):
+        """ Add the counts, skip if <= 0.
+        """
+        return self._binop(other, numpy.add)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        """ Subtract count, but keep only results with positive counts.
+        """
+        return self._binop(other, numpy.subtract)
+
+    def __rsub__(self, other):
+        """ Subtract the counts from other. Keep only positive results if
+            other is a Mapping.
+        """
+        return self._binop(other, lambda counts, other: numpy.subtract(other, counts))
+
+    def __mul__(self, other):
+        """ Multiply elementwise. Strip out non-positive counts only if other is a Mapping.
+        """
+        return self._binop(other, numpy.multiply)
+
+    __rmul__ = __mul__
+
+    def _divide(self, other, divide):
+        """ Divide elementwise with the numpy function divide. Strip out
+            non-positive counts only if other is a Mapping. Elements missing
+            from other are dropped, as in AdvancedCounter.
+        """
+        if not isinstance(other, Mapping) and not other:
+            raise ZeroDivisionError("integer division or modulo by zero")
+        def op(counts, other):
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                result = divide(counts, other)
+            if isinstance(other, numpy.ndarray):
+                result[other == 0] = 0
+            return result
+        return self._binop(other, op)
+
+    def __floordiv__(self, other):
+        """ Floordivide elementwise. Strip out non-positive counts only if other is
+            a Mapping. Elements missing from other are dropped, as in AdvancedCounter.
+        """
+        return self._divide(other, numpy.floor_divide)
+
+    def __truediv__(self, other):
+        """ Divide elementwise, into float counts. Strip out non-positive counts
+            only if other is a Mapping.
+        """
+        return self._divide(other, numpy.true_divide)
+
+    def __div__(self, other):
+        """ Divide elementwise like / does with ints: floor division if the
+            counts and other are integers, true division if either is float.
+        """
+        if isinstance(other, Mapping):
+            other = self._new(self._as_array(other))
+            integral = other.counts.dtype.kind in 'biu'
+        else:
+            integral = isinstance(other, Integral)
+        if integral and self.counts.dtype.kind in 'biu':
+            return self.__floordiv__(other)
+        return self.__truediv__(other)
+
+    def __or__(self, other):
+        """ Union is the maximum of value in either of the input counters.
+        """
+        return self._binop(other, numpy.maximum)
+
+    __ror__ = __or__
+
+    def __and__(self, other):
+        """ Intersection is the minimum of corresponding counts.
+        """
+        return self._binop(other, numpy.minimum)
+
+    __rand__ = __and__
+
+    def __iadd__(self, other):
+        self.counts = (self + other).counts
+        return self
+
+    def __isub__(self, other):
+        self.counts = (self - other).counts
+        return self
+
+    def __ior__(self, other):
+        self.counts = (self | other).counts
+        return self
+
+    def __iand__(self, other):
+        self.counts = (self & other).counts
+        return self
@@ -0,0 +1,171 @@
+""" Counters whose counts fade away over time. """
+from collections import Mapping
+from heapq import nlargest, nsmallest
+from itertools import izip
+from numbers import Number
+from operator import itemgetter
+from acount import AdvancedCounter
+from tools import tally, iter_chunks
+
+
+class DecayingCounter(Mapping):
+    """ A counter whose counts decay exponentially: by factor per tick, or
+        per second of clock time if a clock (like time.time) is given.
+
+        Decay is lazy. The counts are stored divided by a global scale,
+        the decay since a landmark time, so a tick (or decay(), or c *= f)
+        only changes the scale and costs O(1), whatever the size. New
+        counts are added divided by the current scale, and counts are read
+        multiplied by it. Once the scale gets so small that the stored
+        counts could overflow, they are renormalized to the current time,
+        which becomes the new landmark. The counts are floats.
+
+        Decayed counts never reach zero by themselves: use prune() to
+        drop the elements that faded below some count.
+    """
+    __chunksize__ = 1 << 16
+    __minscale__ = 1e-100 # renormalize below this scale
+
+    def __init__(self, iterable=None, factor=0.99, clock=None, **kwds):
+        """ Create a new, empty DecayingCounter, decaying by factor per
+            tick (or second of clock). And if given, count elements from
+            an input iterable. Or, add in the counts of a mapping.
+        """
+        if not 0 < factor <= 1:
+            raise ValueError("factor has to be in (0, 1], not %r" % (factor,))
+        self.factor, self.clock = factor, clock
+        self.landmark = self.now = clock() if clock is not None else 0
+        self.decayed = 1.0 # decay() since the landmark
+        self.raw = {}
+        self.add(iterable, **kwds)
+
+    def scale(self):
+        """ The decay since the landmark: true counts are raw counts times
+            this. Reads the clock, and renormalizes if needed.
+        """
+        if self.clock is not None:
+            self.now = max(self.now, self.clock())
+        scale = self.decayed * self.factor ** (self.now - self.landmark)
+        if scale < self.__minscale__:
+            self._renormalize(scale)
+            scale = 1.0
+        return scale
+
+    def _renormalize(self, scale):
+        """ Scale the raw counts to the current time, the new landmark.
+        """
+        raw = self.raw
+        raw.update(izip(raw.iterkeys(), [ count * scale for count in raw.itervalues() ]))
+        self.landmark, self.decayed = self.now, 1.0
+
+    def tick(self, ticks=1):
+        """ Let ticks ticks pass. O(1).
+        """
+        if self.clock is not None:
+            raise TypeError("%s with a clock ticks by itself" % self.__class__.__name__)
+        self.now += ticks
+
+    def decay(self, factor):
+        """ Multiply all counts with factor. O(1).
+        """
+        if not 0 < factor:
+            raise ValueError("can only decay by a positive factor, not %r" % (factor,))
+        self.decayed *= factor
+        self.scale()
+
+    def __imul__(self, factor):
+        """ Like decay(), for c *= factor.
+        """
+        if not isinstance(factor, Number):
+            return NotImplemented
+        self.decay(factor)
+        return self
+
+    def add(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.add(), for counts at the current time.
+        """
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                self._add_counts(iterable)
+            else: # count in bulk, then add once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    self._add_counts(tally(chunk))
+        if kwds:
+            self.add(kwds)
+
+    def subtract(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.subtract(), for counts at the current time.
+        """
+        if iterable is not None:
+            if not isinstance(iterable, Mapping):
+                iterable = tally(iterable)
+            self._add_counts(iterable, -1)
+        if kwds:
+            self.subtract(kwds)
+
+    def _add_counts(self, counts, sign=1):
+        inverse = sign / self.scale()
+        raw = self.raw
+        raw_get = raw.get
+        for elem, count in counts.iteritems():
+            raw[elem] = raw_get(elem, 0) + count * inverse
+
+    def __getitem__(self, elem):
+        """ The decayed count of elem. Elements not counted are zero.
+        """
+        count = self.raw.get(elem)
+        if count is None:
+            return 0
+        return count * self.scale()
+
+    def __contains__(self, elem):
+        return elem in self.raw
+
+    def get(self, elem, default=None):
+        count = self.raw.get(elem)
+        if count is None:
+            return default
+        return count * self.scale()
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def iteritems(self):
+        scale = self.scale()
+        return ( (elem, count * scale) for elem, count in self.raw.iteritems() )
+
+    def most_common(self, n=None, inverse=False):
+        """ Like AdvancedCounter.most_common(). The raw counts sort like the
+            decayed ones, so only the chosen ones are scaled.
+        """
+        scale = self.scale() # renormalizes first, if needed
+        items = self.raw.iteritems()
+        if n is None:
+            chosen = sorted(items, key=itemgetter(1), reverse=not inverse)
+        elif inverse:
+            chosen = nsmallest(n, items, key=itemgetter(1))
+        else:
+            chosen = nlargest(n, items, key=itemgetter(1))
+        return [ (elem, count * scale) for elem, count in chosen ]
+
+    def prune(self, threshold):
+        """ Drop the elements with decayed counts below threshold.
+        """
+        cut = threshold / self.scale()
+        raw = self.raw
+        for elem in [ elem for elem, count in raw.iteritems() if count < cut ]:
+            del raw[elem]
+
+    def to_counter(self, cls=AdvancedCounter):
+        """ Copy the decayed counts into a counter.
+        """
+        return cls(dict(self.iteritems()))
+
+    def __repr__(self):
+        """ Output like AdvancedCounter, plus the factor.
+        """
+        items = ', '.join(map('%r: %r'.__mod__, self.most_common()))
+        return '%s({%s}, factor=%r)' % (self.__class__.__name__, items, self.factor)
@@ -0,0 +1,328 @@
+""" Counters kept in memory mapped files. """
+import os
+import mmap
+import marshal
+from collections import Mapping
+from hashlib import md5
+from heapq import nlargest, nsmallest
+from itertools import izip, repeat
+from operator import itemgetter
+from struct import Struct
+from acount import AdvancedCounter
+from tools import tally, iter_chunks
+
+_HEADER = Struct('<4sIQQ') # magic, version, capacity, size
+_MAGIC, _VERSION = 'CLMC', 1
+_WORD = Struct('<Q')
+_COUNT = Struct('<q')
+_KEYLEN = Struct('<I')
+
+
+def _key_hash(data):
+    """ Stable 64 bit hash of marshalled key data, never 0 (0 marks empty slots).
+    """
+    return _WORD.unpack_from(md5(data).digest())[0] or 1
+
+
+class MappedCounter(Mapping):
+    """ A counter stored in files, memory mapped, so it can outgrow RAM
+        and be reopened instantly: an open addressing hash table in path,
+        with columns of key hashes, counts and key offsets, and the keys
+        themselves (marshalled) in a side file, path + '.keys'.
+
+        Reading, add(), subtract(), setting counts and most_common() work
+        like with AdvancedCounter. Counts are 64 bit signed integers, keys
+        have to be str, unicode, numbers or tuples of those. Keys are told
+        apart by their marshalled form, so 1, 1L and 1.0 count separately.
+        Elements cannot be deleted, but their counts can be set to zero.
+        Every write goes to the files (the header, with the size, included)
+        as it happens, so the counter can be opened again alongside, or
+        after the process ended without closing it. Call flush() or close()
+        (or use it as a context manager) to make sure the changes reach the
+        disk, should the system go down.
+    """
+    __chunksize__ = 1 << 16
+    __blocksize__ = 1 << 12 # slots read at a time, a power of two
+
+    def __init__(self, path, iterable=None, capacity=1 << 12, **kwds):
+        """ Open the counter stored at path, or create a new, empty one with
+            room for capacity slots (rounded up to a power of two). And if
+            given, count elements from an input iterable. Or, add in the
+            counts of a mapping.
+        """
+        self.path = path
+        self._map = self._keymap = None
+        self._recent = {} # offsets to data of keys appended since the last remap
+        if os.path.exists(path):
+            self._file = open(path, 'r+b')
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            magic, version, self.capacity, self.size = _HEADER.unpack_from(self._map)
+            if (magic, version) != (_MAGIC, _VERSION):
+                raise ValueError("%r is no MappedCounter file" % (path,))
+            self._set_regions()
+        else:
+            cap = 1
+            while cap < capacity:
+                cap <<= 1
+            self._file = open(path, 'w+b')
+            open(path + '.keys', 'wb').close()
+            self._resize(cap)
+        self._keys = open(path + '.keys', 'ab', 0) # unbuffered, see _append_key()
+        self._keys_read = open(path + '.keys', 'rb')
+        self._keys_end = os.path.getsize(path + '.keys')
+        self._remap_keys()
+        self.add(iterable, **kwds)
+
+    def _resize(self, capacity):
+        """ (Re)create the table file with capacity slots. The entries get
+            rehashed slot by slot into a new file, which then replaces the
+            old one, so the table is never held in memory. The keys file
+            stays as it is.
+        """
+        if self._map is None:
+            table = self._file
+        else:
+            table = open(self.path + '.resize', 'w+b')
+        table.truncate(_HEADER.size + 24 * capacity) # zeros: all slots empty
+        table.flush()
+        m = mmap.mmap(table.fileno(), 0)
+        hashes, mask = _HEADER.size, capacity - 1
+        counts, offsets = hashes + 8 * capacity, hashes + 16 * capacity
+        unpack_word, pack_word, pack_count = _WORD.unpack_from, _WORD.pack_into, _COUNT.pack_into
+        size = 0
+        if self._map is not None:
+            for h, count, offset in self._iter_slots():
+                slot = h & mask
+                while unpack_word(m, hashes + 8 * slot)[0]:
+                    slot = (slot + 1) & mask
+                pack_word(m, hashes + 8 * slot, h)
+                pack_count(m, counts + 8 * slot, count)
+                pack_word(m, offsets + 8 * slot, offset)
+                size += 1
+            self._map.close()
+            self._file.close()
+            os.rename(table.name, self.path)
+        self._file, self._map = table, m
+        self.capacity, self.size = capacity, size
+        self._set_regions()
+        self._write_header()
+
+    def _write_header(self):
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self.capacity, self.size)
+
+    def _set_regions(self):
+        """ Remember the offsets of the hash, count and key offset columns.
+        """
+        base, cap = _HEADER.size, self.capacity
+        self._hashes, self._counts, self._offsets = base, base + 8 * cap, base + 16 * cap
+
+    def _remap_keys(self):
+        """ Map the keys file again, to see the keys appended since.
+        """
+        self._keys.flush()
+        if self._keymap is not None:
+            self._keymap.close()
+        self._keymap = None
+        if self._keys_end:
+            self._keymap = mmap.mmap(self._keys_read.fileno(), 0, access=mmap.ACCESS_READ)
+        self._recent.clear()
+
+    def _key_data(self, offset):
+        """ The marshalled key stored at offset of the keys file.
+        """
+        data = self._recent.get(offset)
+        if data is None:
+            keymap = self._keymap
+            start = offset + _KEYLEN.size
+            data = keymap[start:start + _KEYLEN.unpack_from(keymap, offset)[0]]
+        return data
+
+    def _append_key(self, data):
+        """ Append marshalled key data to the keys file, return its offset.
+        """
+        offset = self._keys_end
+        self._keys.write(_KEYLEN.pack(len(data)) + data) # in the file right away
+        self._keys_end += _KEYLEN.size + len(data)
+        self._recent[offset] = data
+        if len(self._recent) >= self.__chunksize__:
+            self._remap_keys()
+        return offset
+
+    def _set_slot(self, slot, h, count, offset):
+        m, pos = self._map, 8 * slot
+        _WORD.pack_into(m, self._hashes + pos, h)
+        _COUNT.pack_into(m, self._counts + pos, count)
+        _WORD.pack_into(m, self._offsets + pos, offset)
+
+    def _iter_slots(self):
+        """ Iterator over the (hash, count, key offset) of the used slots.
+            The columns are read in blocks of __blocksize__ slots.
+        """
+        cap, m = self.capacity, self._map
+        hashes, counts, offsets = self._hashes, self._counts, self._offsets
+        n = min(cap, self.__blocksize__) # both powers of two
+        unpack_words, unpack_counts = Struct('<%dQ' % n).unpack_from, Struct('<%dq' % n).unpack_from
+        for pos in xrange(0, 8 * cap, 8 * n):
+            block = izip(unpack_words(m, hashes + pos), unpack_counts(m, counts + pos),
+                         unpack_words(m, offsets + pos))
+            for entry in block:
+                if entry[0]:
+                    yield entry
+
+    def _read_key(self, offset):
+        return marshal.loads(self._key_data(offset))
+
+    def _probe(self, h, data):
+        """ Find the slot of the key with hash h (and marshalled data): returns
+            (slot, key offset), with offset None if the key is not there and
+            slot the empty slot to put it in. If data is None, the first empty
+            slot is returned.
+        """
+        m, mask = self._map, self.capacity - 1
+        hashes, unpack_word = self._hashes, _WORD.unpack_from
+        slot = h & mask
+        while True:
+            found, = unpack_word(m, hashes + 8 * slot)
+            if not found:
+                return slot, None
+            if found == h and data is not None:
+                offset, = unpack_word(m, self._offsets + 8 * slot)
+                if self._key_data(offset) == data:
+                    return slot, offset
+            slot = (slot + 1) & mask
+
+    def _lookup(self, elem):
+        """ (slot, key offset, hash, marshalled data) of elem.
+        """
+        data = marshal.dumps(elem, 0) # version 0 does not mark interned strings
+        h = _key_hash(data)
+        slot, offset = self._probe(h, data)
+        return slot, offset, h, data
+
+    def get(self, elem, default=None):
+        try:
+            slot, offset, h, data = self._lookup(elem)
+        except ValueError: # not marshallable, so never counted
+            return default
+        if offset is None:
+            return default
+        return _COUNT.unpack_from(self._map, self._counts + 8 * slot)[0]
+
+    def __getitem__(self, elem):
+        """ The count of elem. Elements not counted are zero.
+        """
+        return self.get(elem, 0)
+
+    def __contains__(self, elem):
+        try:
+            return self._lookup(elem)[1] is not None
+        except ValueError:
+            return False
+
+    def _store(self, elem, count, relative):
+        """ Set (or, if relative, add to) the count of elem.
+        """
+        slot, offset, h, data = self._lookup(elem)
+        if offset is not None:
+            counts = self._counts + 8 * slot
+            if relative:
+                count += _COUNT.unpack_from(self._map, counts)[0]
+            _COUNT.pack_into(self._map, counts, count)
+            return
+        self._set_slot(slot, h, count, self._append_key(data))
+        self.size += 1
+        if self.size * 10 > self.capacity * 7:
+            self._resize(self.capacity * 2)
+        else:
+            self._write_header()
+
+    def __setitem__(self, elem, count):
+        self._store(elem, count, False)
+
+    def __len__(self):
+        return self.size
+
+    def iteritems(self):
+        read_key = self._read_key
+        return ( (read_key(offset), count) for h, count, offset in self._iter_slots() )
+
+    def __iter__(self):
+        read_key = self._read_key
+        return ( read_key(offset) for h, count, offset in self._iter_slots() )
+
+    def add(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.add().
+        """
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                for elem, count in iterable.iteritems():
+                    self._store(elem, count, True)
+            else: # count in bulk, then probe once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    for elem, count in tally(chunk).iteritems():
+                        self._store(elem, count, True)
+        if kwds:
+            self.add(kwds)
+
+    def subtract(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.subtract().
+        """
+        if iterable is not None:
+            if not isinstance(iterable, Mapping):
+                iterable = tally(iterable)
+            for elem, count in iterable.iteritems():
+                self._store(elem, -count, True)
+        if kwds:
+            self.subtract(kwds)
+
+    def most_common(self, n=None, inverse=False):
+        """ Like AdvancedCounter.most_common(). The counts are compared
+            straight from the mapped column, only the keys making the cut
+            are read.
+        """
+        pairs = ( (count, offset) for h, count, offset in self._iter_slots() )
+        if n is None:
+            chosen = sorted(pairs, key=itemgetter(0), reverse=not inverse)
+        elif inverse:
+            chosen = nsmallest(n, pairs, key=itemgetter(0))
+        else:
+            chosen = nlargest(n, pairs, key=itemgetter(0))
+        read_key = self._read_key
+        return [ (read_key(offset), count) for count, offset in chosen ]
+
+    def elements(self):
+        """ Like AdvancedCounter.elements().
+        """
+        for elem, count in self.iteritems():
+            for _ in repeat(None, count):
+                yield elem
+
+    def to_counter(self, cls=AdvancedCounter):
+        """ Load into a dict based counter.
+        """
+        return cls(dict(self.iteritems()))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+    def flush(self):
+        """ Write the changes to disk.
+        """
+        self._write_header()
+        self._map.flush()
+        self._remap_keys()
+
+    def close(self):
+        self.flush()
+        self._map.close()
+        self._file.close()
+        if self._keymap is not None:
+            self._keymap.close()
+        self._keys.close()
+        self._keys_read.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
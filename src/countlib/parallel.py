@@ -0,0 +1,199 @@
+""" Counting on several processes. """
+import os
+import traceback
+from itertools import chain, cycle, imap, izip
+from multiprocessing import Process, Queue, cpu_count
+from Queue import Empty, Full
+from acount import AdvancedCounter
+from tools import tally, iter_chunks
+
+
+def _tally_queue(queue):
+    """ Count the elements of the lists put on queue (until None) into
+        one dict, all in a row.
+    """
+    return dict(tally(chain.from_iterable(iter(queue.get, None))))
+
+def _tally_file_range(path, start, stop, words, blocksize):
+    """ Count the lines (or words) in a byte range of a file.
+        The range has to start and end at line boundaries.
+    """
+    def iter_lines():
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining, carry = stop - start, ''
+            while remaining > 0:
+                block = f.read(min(blocksize, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                lines = (carry + block).split('\n')
+                carry = lines.pop()
+                for line in lines:
+                    yield line
+            if carry:
+                yield carry
+
+    if words:
+        return dict(tally(chain.from_iterable(imap(str.split, iter_lines()))))
+    return dict(tally(iter_lines()))
+
+def _add_into(counts, other):
+    """ Add the counts of dict other into dict counts, or the other way
+        round if other is bigger. Returns the one added into.
+    """
+    if len(counts) < len(other):
+        counts, other = other, counts
+    counts_get = counts.get
+    for elem, count in other.iteritems():
+        counts[elem] = counts_get(elem, 0) + count
+    return counts
+
+def _worker(rank, size, count, args, merges, results):
+    """ Worker process number rank of size: count(*args) into one dict,
+        then reduce the dicts of all workers as a tree, in parallel: in
+        round r, the workers with rank % 2**(r+1) == 2**r hand their counts
+        to rank - 2**r and stop, so worker 0 ends up with the total and
+        puts it on results.
+    """
+    try:
+        counts = count(*args)
+        step = 1
+        while step < size:
+            if rank % (2 * step):
+                merges[rank - step].put(counts)
+                return
+            if rank + step < size:
+                counts = _add_into(counts, merges[rank].get())
+            step *= 2
+        results.put((True, counts))
+    except Exception:
+        results.put((False, traceback.format_exc()))
+
+def line_offsets(path, parts):
+    """ Split a file into (at most) parts byte ranges that start and end
+        at line boundaries. Returns the list of (start, stop) offsets.
+    """
+    size = os.path.getsize(path)
+    cuts = [0]
+    with open(path, 'rb') as f:
+        for part in xrange(1, parts):
+            guess = size * part // parts
+            if guess <= cuts[-1]:
+                continue
+            f.seek(guess - 1)
+            f.readline() # the line around guess belongs to the range before
+            cut = f.tell()
+            if cut >= size:
+                break
+            if cut > cuts[-1]:
+                cuts.append(cut)
+    cuts.append(size)
+    return [ (a, b) for a, b in zip(cuts, cuts[1:]) if a < b ]
+
+def tree_reduce(counters):
+    """ Add up a list of counters pairwise, in rounds, the way the workers
+        reduce their counts. Done in one process, this adds every count in
+        about as often as a plain fold would, so it is no faster; only
+        spread over processes, the additions of a round run side by side.
+        Uses and returns the first counter of each pair, with add() semantics.
+    """
+    counters = list(counters)
+    if not counters:
+        return None
+    while len(counters) > 1:
+        paired = []
+        for i in xrange(0, len(counters) - 1, 2):
+            left, right = counters[i], counters[i + 1]
+            if len(left) < len(right): # add the smaller one in
+                left, right = right, left
+            left.add(right)
+            paired.append(left)
+        if len(counters) % 2:
+            paired.append(counters[-1])
+        counters = paired
+    return counters[0]
+
+def _check(workers, results):
+    """ Raise if a worker failed (or died).
+    """
+    if not all(worker.is_alive() or worker.exitcode == 0 for worker in workers):
+        raise RuntimeError("a counting process died")
+    try:
+        ok, error = results.get_nowait()
+    except Empty:
+        return
+    if ok: # cannot be, while still feeding
+        raise RuntimeError("counting finished early")
+    raise RuntimeError("counting failed in a worker process:\n" + error)
+
+def _put(queue, item, workers, results):
+    """ Put item on queue, unless the workers fail meanwhile.
+    """
+    while True:
+        try:
+            return queue.put(item, timeout=0.1)
+        except Full:
+            _check(workers, results)
+
+def _run(count, argses, feed=None):
+    """ Start a worker process per args in argses, to count(*args) and
+        reduce the counts. If given, feed(workers, results) is called to
+        send them their input. Returns the total dict.
+    """
+    size = len(argses)
+    merges, results = [ Queue() for _ in xrange(size) ], Queue()
+    workers = [ Process(target=_worker, args=(rank, size, count, args, merges, results))
+                for rank, args in enumerate(argses) ]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    try:
+        if feed is not None:
+            feed(workers, results)
+        while True:
+            try:
+                ok, counts = results.get(timeout=0.1)
+                break
+            except Empty:
+                if not all(worker.is_alive() or worker.exitcode == 0 for worker in workers):
+                    raise RuntimeError("a counting process died")
+        if not ok:
+            raise RuntimeError("counting failed in a worker process:\n" + counts)
+    except:
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+    return counts
+
+def count_parallel(iterable, processes=None, chunksize=1 << 16, cls=AdvancedCounter):
+    """ Count the elements of iterable on processes worker processes (as
+        many as there are CPUs by default). The input is dealt out to the
+        workers in lists of chunksize elements, round robin, and each worker
+        counts all of its lists into one dict. The workers then reduce these
+        among themselves, pairwise in parallel rounds, and the total is
+        returned as a counter of class cls. Elements have to be picklable.
+    """
+    processes = processes or cpu_count()
+    inboxes = [ Queue(2) for _ in xrange(processes) ] # bounds the input in flight
+
+    def feed(workers, results):
+        for inbox, chunk in izip(cycle(inboxes), iter_chunks(iterable, chunksize)):
+            _put(inbox, chunk, workers, results)
+        for inbox in inboxes:
+            _put(inbox, None, workers, results)
+
+    return cls(_run(_tally_queue, [ (inbox,) for inbox in inboxes ], feed))
+
+def count_file(path, processes=None, words=False, cls=AdvancedCounter, blocksize=1 << 20):
+    """ Count the lines of a file (without their newlines) on worker
+        processes. With words, count the whitespace separated words instead.
+        Each worker reads its own byte range of the file, so only the counts
+        have to travel between the processes, reduced like in count_parallel().
+    """
+    ranges = line_offsets(path, processes or cpu_count()) or [ (0, 0) ]
+    argses = [ (path, start, stop, words, blocksize) for start, stop in ranges ]
+    return cls(_run(_tally_file_range, argses))
@@ -1,6 +1,7 @@
 """ Pivot table variants. """
 
 from basepivot import PivotCounterBase
+from tools import pivot_chunks
 from collections import Counter
 
 class PivotCounter(PivotCounterBase):
@@ -23,8 +24,14 @@ class PivotCounter(PivotCounterBase):
                         self_sdf(count, set()).add(elem)
                     except TypeError: # another PivotCounter?
                         self_sdf(elem, set()).update(count)
-            else: # slow mem eater path (by now)
-                self.update(Counter(iterable))
+            else: # stream the elements, holding one chunk at a time
+                self.__unpivot__ = Counter
+                if self: # union in the pivot of iterable, as above
+                    buckets = {}
+                    pivot_chunks(buckets, iterable, self.__chunksize__)
+                    self.merge(buckets)
+                else:
+                    pivot_chunks(self, iterable, self.__chunksize__)
         if kwds:
             self.update(kwds)
 
@@ -35,6 +42,13 @@ class PivotCounter(PivotCounterBase):
         """
         return self.setdefault(key, set())
 
+    def merge(self, *others):
+        """ Union the sets of any number of other pivot tables into this one.
+        """
+        for other in others:
+            for count, elem_set in other.iteritems():
+                self[count].update(elem_set)
+
     def copy(self):
         """ Like dict.copy() but returns a PivotCounter instance instead of a dict.
             The sets acting as values are copied as well.
@@ -59,17 +73,45 @@ class CoolPivotCounter(PivotCounterBase):
                 dict.update(self, iterable) # fast path when counter is empty
             elif hasattr(iterable, 'iteritems'): # assumed Counters and dicts
                 self.__unpivot__ = iterable.__class__
-                self_get = self.get
+                buckets = {}
+                buckets_sdf = buckets.setdefault
                 for elem, count in iterable.iteritems():
                     try: # a normal Counter entry
-                        self[count] = self_get(count, frozenset()).union([elem])
+                        buckets_sdf(count, set()).add(elem)
                     except TypeError: # another CoolPivotCounter?
-                        self[elem] = self_get(elem, frozenset()).union(count)
-            else: # slow mem eater path (by now)
-                self.update(Counter(iterable))
+                        buckets_sdf(elem, set()).update(count)
+                self._freeze_in(buckets)
+            else: # stream the elements, holding one chunk at a time
+                self.__unpivot__ = Counter
+                buckets = {}
+                pivot_chunks(buckets, iterable, self.__chunksize__)
+                self._freeze_in(buckets)
         if kwds:
             self.update(kwds)
 
+    def _freeze_in(self, buckets):
+        """ Union a dict of counts to mutable sets into this table,
+            building each frozenset only once. The dict is emptied
+            on the way, so no set is held twice for long.
+        """
+        self_get = self.get
+        while buckets:
+            count, bucket = buckets.popitem()
+            old = self_get(count)
+            self[count] = frozenset(bucket) if old is None else old.union(bucket)
+
+    def merge(self, *others):
+        """ Union the sets of any number of other pivot tables into this one.
+            The elements are collected per count first, so each set is frozen
+            once instead of being copied for every table merged in.
+        """
+        buckets = {}
+        buckets_sdf = buckets.setdefault
+        for other in others:
+            for count, elem_set in other.iteritems():
+                buckets_sdf(count, set()).update(elem_set)
+        self._freeze_in(buckets)
+
     def __missing__(self, key):
         """ Return an empty set if asked for a missing key, but don't store it.
             Since the values are immutable, the key is not added to the dict.
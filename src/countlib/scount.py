@@ -0,0 +1,187 @@
+""" Bounded counters for heavy hitters. """
+from collections import Mapping
+from heapq import nlargest
+from operator import itemgetter
+from xcount import ExtremeCounter
+from tools import tally, iter_chunks
+
+
+class SpaceSavingCounter(Mapping):
+    """ Approximate counter that keeps at most capacity elements, using the
+        Space-Saving algorithm: once full, a new element takes the place of
+        the least counted one and inherits its count as an overestimation.
+
+        The counts are estimates. For each element, the true count lies
+        between count - error(elem) and count, and every element counted
+        more than total / capacity times is guaranteed to be kept.
+        Only positive counts can be added; there is no subtract.
+
+        Summaries of several shards can be merged with + (or |), with the
+        same bounds holding for the merged input.
+    """
+    __chunksize__ = 1 << 16
+
+    def __init__(self, iterable=None, capacity=1000, **kwds):
+        """ Create a new, empty SpaceSavingCounter for at most capacity
+            elements. And if given, count elements from an input iterable.
+            Or, add in the counts of another mapping of elements to counts.
+        """
+        if capacity < 1:
+            raise ValueError("capacity has to be at least 1, not %r" % (capacity,))
+        self.capacity = capacity
+        self.total = 0
+        self.counts = ExtremeCounter()
+        self.errors = {}
+        self._index = self.counts.build_index()
+        self.add(iterable, **kwds)
+
+    def __getitem__(self, elem):
+        """ The estimated count of elem. Elements not kept are zero.
+        """
+        return self.counts.get(elem, 0)
+
+    def __contains__(self, elem):
+        return elem in self.counts
+
+    def get(self, elem, default=None):
+        return self.counts.get(elem, default)
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def iteritems(self):
+        return self.counts.iteritems()
+
+    def error(self, elem):
+        """ How much the count of elem may be overestimated.
+        """
+        return self.errors.get(elem, 0)
+
+    def guaranteed(self, elem):
+        """ The lower bound of the true count of elem.
+        """
+        return self[elem] - self.error(elem)
+
+    def floor(self):
+        """ Upper bound of the true count of any element not kept:
+            the smallest count once full, zero before that.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._index.counts[0]
+
+    def __repr__(self):
+        """ Output like AdvancedCounter, plus the capacity.
+        """
+        if not self:
+            return '%s(capacity=%r)' % (self.__class__.__name__, self.capacity)
+        items = ', '.join(map('%r: %r'.__mod__, self.most_common()))
+        return '%s({%s}, capacity=%r)' % (self.__class__.__name__, items, self.capacity)
+
+    def _count(self, elem, count):
+        """ Count elem count more times, evicting the least counted
+            element if elem is new and there is no room left.
+        """
+        if count <= 0:
+            if count < 0:
+                raise ValueError("SpaceSavingCounter cannot subtract, got %r" % (count,))
+            return
+        counts = self.counts
+        self.total += count
+        old = counts.get(elem)
+        if old is not None:
+            counts[elem] = old + count
+        elif len(counts) < self.capacity:
+            counts[elem] = count
+        else:
+            index = self._index
+            least = index.counts[0]
+            victim = next(iter(index[least]))
+            del counts[victim]
+            self.errors.pop(victim, None)
+            counts[elem] = least + count
+            self.errors[elem] = least
+
+    def add(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.add(): count the elements of an iterable,
+            or add in the (positive) counts of a mapping.
+        """
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                for elem, count in iterable.iteritems():
+                    self._count(elem, count)
+            else: # count in bulk, then once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    for elem, count in tally(chunk).iteritems():
+                        self._count(elem, count)
+        if kwds:
+            self.add(kwds)
+
+    def most_common(self, n=None):
+        """ List the n elements with the highest estimated counts and their
+            counts, from the most common to the least. Ties are listed in
+            no particular order.
+        """
+        return self.counts.most_common(n)
+
+    def elements(self):
+        """ Iterator over elements repeating each as many times as its
+            estimated count.
+        """
+        return self.counts.elements()
+
+    def copy(self):
+        result = self.__class__(capacity=self.capacity)
+        result.counts.update(self.counts)
+        result.errors.update(self.errors)
+        result.total = self.total
+        return result
+
+    def _merge(self, other, combine):
+        """ Merge two summaries into a new one with my capacity. Elements
+            missing from one side get that side's floor as count and error.
+            combine gets both (count, error) pairs and returns the merged one.
+            Then only the capacity highest counts are kept.
+        """
+        if not isinstance(other, SpaceSavingCounter):
+            return NotImplemented
+        sfloor, ofloor = (self.floor(),) * 2, (other.floor(),) * 2
+        def bounds(summary, elem, floor):
+            if elem in summary.counts:
+                return summary.counts[elem], summary.error(elem)
+            return floor
+        merged = []
+        for elem in set(self.counts).union(other.counts):
+            count, error = combine(bounds(self, elem, sfloor), bounds(other, elem, ofloor))
+            merged.append((elem, count, error))
+        result = self.__class__(capacity=self.capacity)
+        result.total = combine((self.total, 0), (other.total, 0))[0]
+        for elem, count, error in nlargest(self.capacity, merged, key=itemgetter(1)):
+            result.counts[elem] = count
+            if error:
+                result.errors[elem] = error
+        return result
+
+    def __add__(self, other):
+        """ Merge the summaries of two (disjoint) inputs: the counts add up.
+        """
+        def add((count, error), (ocount, oerror)):
+            return count + ocount, error + oerror
+        return self._merge(other, add)
+
+    def __or__(self, other):
+        """ Merge the summaries of two overlapping inputs: take the maximum.
+        """
+        return self._merge(other, max)
+
+    def __iadd__(self, other):
+        """ Add in the counts of a mapping or iterable, or merge in another
+            summary with +.
+        """
+        if isinstance(other, SpaceSavingCounter):
+            return self + other
+        self.add(other)
+        return self
@@ -0,0 +1,198 @@
+""" Compact binary format for counters and pivot tables. """
+import sys
+import marshal
+from array import array
+from collections import Counter
+from cStringIO import StringIO
+from itertools import chain, imap, islice, izip
+from struct import Struct
+from acount import AdvancedCounter
+from xcount import ExtremeCounter
+from basepivot import PivotCounterBase
+from pivot import PivotCounter, CoolPivotCounter
+
+_HEADER = Struct('<4sBB') # magic, version, kind
+_MAGIC, _VERSION = 'CLSF', 2 # version 1 had no unpivot class for pivots
+_COUNTER, _PIVOT = 0, 1
+_KEYDICT = 2 # flag on the kind: the elements refer to a key dictionary
+_SIZE = Struct('<I')
+_MARSHALLED = 'M' # typecode of count columns that are no machine integers
+
+CHUNKSIZE = 1 << 16
+
+classes = dict((cls.__name__, cls) for cls in
+               (Counter, AdvancedCounter, ExtremeCounter, PivotCounter, CoolPivotCounter))
+
+
+def register(cls):
+    """ Make load() find cls by its name, like a subclass of a counter or
+        pivot table. Returns cls, so it can decorate the class statement.
+    """
+    classes[cls.__name__] = cls
+    return cls
+
+def _write_blob(write, data):
+    write(_SIZE.pack(len(data)))
+    write(data)
+
+def _read_blob(read):
+    size, = _SIZE.unpack(read(_SIZE.size))
+    return read(size)
+
+def _write_column(write, numbers):
+    """ Write a list of numbers as an array of the narrowest (little endian)
+        integer type that fits, or marshalled if they are no such integers.
+    """
+    column = None
+    if numbers and bool not in set(imap(type, numbers)): # keep bools bools
+        low, high = min(numbers), max(numbers)
+        for typecode in 'bhil':
+            limit = 1 << (8 * array(typecode).itemsize - 1)
+            if -limit <= low and high < limit:
+                try:
+                    column = array(typecode, numbers)
+                except TypeError: # floats or the like
+                    pass
+                break
+    if column is None:
+        write(_MARSHALLED)
+        _write_blob(write, marshal.dumps(numbers))
+        return
+    if sys.byteorder == 'big':
+        column.byteswap()
+    write(column.typecode)
+    write(chr(column.itemsize))
+    _write_blob(write, column.tostring())
+
+def _read_column(read):
+    typecode = read(1)
+    if typecode == _MARSHALLED:
+        return marshal.loads(_read_blob(read))
+    itemsize = ord(read(1))
+    column = array(typecode)
+    if column.itemsize != itemsize: # written on a machine with other widths
+        data = _read_blob(read)
+        fmt = '<%d%s' % (len(data) // itemsize, {1: 'b', 2: 'h', 4: 'i', 8: 'q'}[itemsize])
+        return list(Struct(fmt).unpack(data))
+    column.fromstring(_read_blob(read))
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+def _write_elems(write, elems, index):
+    """ Write a list of elements (counter keys or pivot set members):
+        marshalled, or with a key dictionary index, as a column of their
+        positions in it, followed by the positions and elements of those
+        not in it.
+    """
+    if index is None:
+        _write_blob(write, marshal.dumps(elems))
+        return
+    found = map(index.get, elems)
+    missing = [ i for i, at in enumerate(found) if at is None ]
+    for i in missing:
+        found[i] = 0
+    _write_column(write, found)
+    _write_blob(write, marshal.dumps((missing, [ elems[i] for i in missing ])))
+
+def _read_elems(read, keydict):
+    if keydict is None:
+        return marshal.loads(_read_blob(read))
+    elems = map(keydict.__getitem__, _read_column(read))
+    missing, others = marshal.loads(_read_blob(read))
+    for i, elem in izip(missing, others):
+        elems[i] = elem
+    return elems
+
+def dump(counter, f, chunksize=CHUNKSIZE, keydict=None):
+    """ Write counter (an AdvancedCounter or PivotCounter, or subclass) to
+        the file f, streaming chunksize keys at a time. The keys are
+        marshalled (so they have to be str, unicode, numbers, tuples...),
+        the counts are packed into arrays of the narrowest fitting type.
+        With a key dictionary, a list of keys that load() is given too
+        (like a fixed vocabulary), the keys in it are written as their
+        positions in it, packed like the counts. For pivot tables, the
+        dictionary is one of the elements in the sets.
+    """
+    write = f.write
+    pivot = isinstance(counter, PivotCounterBase)
+    kind = _PIVOT if pivot else _COUNTER
+    index = None
+    if keydict is not None:
+        kind |= _KEYDICT
+        index = dict(izip(keydict, xrange(len(keydict))))
+    write(_HEADER.pack(_MAGIC, _VERSION, kind))
+    _write_blob(write, counter.__class__.__name__)
+    if pivot:
+        _write_blob(write, counter.__unpivot__.__name__)
+    iterkeys, itervalues = counter.iterkeys(), counter.itervalues() # no tuples
+    while True:
+        keys = list(islice(iterkeys, chunksize))
+        values = list(islice(itervalues, chunksize))
+        write(_SIZE.pack(len(keys)))
+        if not keys:
+            break
+        if pivot: # the counts, set sizes, then all elements in a row
+            _write_blob(write, marshal.dumps(keys))
+            _write_column(write, map(len, values))
+            _write_elems(write, list(chain.from_iterable(values)), index)
+        else:
+            _write_elems(write, keys, index)
+            _write_column(write, values)
+
+def load(f, cls=None, keydict=None):
+    """ Read a counter written by dump() from the file f. The class written
+        along is used, unless cls is given. Classes are found by name among
+        the classes of countlib and those made known by register(); others
+        load as AdvancedCounter (or PivotCounter), so pass cls for them.
+        The same goes for the class a pivot table unpivots to. Counters are
+        filled by dict.update(), so no per-key Python code runs and
+        ExtremeCounters come without a count index. If the counter was
+        written with a key dictionary, the same one has to be given.
+    """
+    read = f.read
+    magic, version, kind = _HEADER.unpack(read(_HEADER.size))
+    if magic != _MAGIC or not 1 <= version <= _VERSION:
+        raise ValueError("not a countlib serialization")
+    if not kind & _KEYDICT:
+        keydict = None
+    elif keydict is None:
+        raise ValueError("written with a key dictionary, which has to be given")
+    kind &= ~_KEYDICT
+    name = _read_blob(read)
+    if cls is None:
+        cls = classes.get(name, PivotCounter if kind == _PIVOT else AdvancedCounter)
+    result = cls()
+    if kind == _PIVOT and version > 1:
+        unpivot = classes.get(_read_blob(read))
+        if unpivot is not None:
+            result.__unpivot__ = unpivot
+    while True:
+        size, = _SIZE.unpack(read(_SIZE.size))
+        if not size:
+            return result
+        if kind == _PIVOT:
+            bucket = frozenset if issubclass(cls, CoolPivotCounter) else set
+            keys = marshal.loads(_read_blob(read))
+            sizes = _read_column(read)
+            elems = _read_elems(read, keydict)
+            start = 0
+            for count, stop in izip(keys, sizes):
+                stop += start
+                dict.__setitem__(result, count, bucket(elems[start:stop]))
+                start = stop
+        else:
+            keys = _read_elems(read, keydict)
+            dict.update(result, izip(keys, _read_column(read)))
+
+def dumps(counter, chunksize=CHUNKSIZE, keydict=None):
+    """ Like dump(), into a string.
+    """
+    f = StringIO()
+    dump(counter, f, chunksize, keydict)
+    return f.getvalue()
+
+def loads(data, cls=None, keydict=None):
+    """ Like load(), from a string.
+    """
+    return load(StringIO(data), cls, keydict)
@@ -0,0 +1,215 @@
+""" Counters split into shards. """
+from collections import Mapping, MutableMapping
+from heapq import nlargest, nsmallest
+from itertools import chain, repeat
+from operator import itemgetter
+from operator import add, sub, or_, and_
+from acount import AdvancedCounter
+from tools import tally, iter_chunks
+
+
+def _star(args):
+    """ Call the function args[0] with the remaining args.
+    """
+    return args[0](*args[1:])
+
+
+class ShardedCounter(MutableMapping):
+    """ A counter that hash-partitions its elements over a number of
+        AdvancedCounter shards (or cls), so no single dict has to hold
+        (and resize) all of them. It offers the interface of AdvancedCounter:
+        the mapping methods, add, subtract, most_common, elements and the
+        operators + - | & (with Mappings or scalars).
+
+        All work that touches several shards goes shard by shard through
+        mapper, which is map by default. Any callable with the signature of
+        map(func, iterable) fits in, e.g. the map of a thread pool. Counters with the same
+        class and number of shards are combined shard by shard directly;
+        other Mappings are partitioned first.
+    """
+    __chunksize__ = 1 << 20
+
+    def __init__(self, iterable=None, shards=16, mapper=map, cls=AdvancedCounter, **kwds):
+        """ Create a new, empty ShardedCounter with the given number of shards.
+            And if given, count elements from an input iterable. Or, add in
+            the counts of another mapping of elements to counts.
+        """
+        if shards < 1:
+            raise ValueError("need at least one shard, not %r" % (shards,))
+        self.shards = [ cls() for _ in xrange(shards) ]
+        self.mapper = mapper
+        self.cls = cls
+        self.add(iterable, **kwds)
+
+    def _new(self, shards):
+        """ A ShardedCounter like me, holding the given shards.
+        """
+        result = self.__class__(shards=len(self.shards), mapper=self.mapper, cls=self.cls)
+        result.shards = list(shards)
+        return result
+
+    def _map(self, func, *iterables):
+        """ Apply func to each shard (and the matching arguments) via mapper.
+        """
+        return list(self.mapper(_star, zip(repeat(func), *iterables)))
+
+    def shard_of(self, elem):
+        """ The number of the shard elem belongs in. Override to partition
+            differently; equal elements have to land in the same shard.
+        """
+        return hash(elem) % len(self.shards)
+
+    def shard(self, elem):
+        """ The shard elem belongs in.
+        """
+        return self.shards[self.shard_of(elem)]
+
+    def _partition(self, items):
+        """ Split (element, count) pairs into one dict per shard.
+        """
+        parts = [ {} for _ in self.shards ]
+        shard_of = self.shard_of
+        for elem, count in items:
+            parts[shard_of(elem)][elem] = count
+        return parts
+
+    def _aligned(self, other):
+        """ The counts of other per shard, or None if other is no Mapping.
+        """
+        if isinstance(other, ShardedCounter) and other.__class__ is self.__class__ \
+                and len(other.shards) == len(self.shards):
+            return other.shards
+        if isinstance(other, Mapping):
+            return self._partition(other.iteritems())
+        return None
+
+    def __getitem__(self, elem):
+        """ The count of elem. Elements not counted are zero.
+        """
+        return self.shard(elem)[elem]
+
+    def __setitem__(self, elem, count):
+        self.shard(elem)[elem] = count
+
+    def __delitem__(self, elem):
+        """ Like AdvancedCounter.__delitem__(), does not raise KeyError.
+        """
+        shard = self.shard(elem)
+        if elem in shard:
+            del shard[elem]
+
+    def __contains__(self, elem):
+        return elem in self.shard(elem)
+
+    def get(self, elem, default=None):
+        return self.shard(elem).get(elem, default)
+
+    def pop(self, elem, *default):
+        return self.shard(elem).pop(elem, *default)
+
+    def setdefault(self, elem, default=None):
+        return self.shard(elem).setdefault(elem, default)
+
+    def __iter__(self):
+        return chain.from_iterable(self.shards)
+
+    def __len__(self):
+        return sum(map(len, self.shards))
+
+    def iteritems(self):
+        return chain.from_iterable(shard.iteritems() for shard in self.shards)
+
+    def clear(self):
+        for shard in self.shards:
+            shard.clear()
+
+    def __repr__(self):
+        """ Output like AdvancedCounter, plus the number of shards.
+        """
+        if not self:
+            return '%s(shards=%r)' % (self.__class__.__name__, len(self.shards))
+        items = ', '.join(map('%r: %r'.__mod__, self.iteritems()))
+        return '%s({%s}, shards=%r)' % (self.__class__.__name__, items, len(self.shards))
+
+    def copy(self):
+        return self._new(self._map(self.cls.copy, self.shards))
+
+    def _fold(self, method, iterable, kwds):
+        """ Apply method (like cls.add) with the counts of iterable (tallied
+            in chunks) to every shard.
+        """
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                chunks = [self._aligned(iterable)]
+            else:
+                chunks = ( self._partition(tally(chunk).iteritems())
+                           for chunk in iter_chunks(iterable, self.__chunksize__) )
+            for parts in chunks:
+                self._map(method, self.shards, parts)
+        if kwds:
+            self._fold(method, kwds, None)
+
+    def add(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.add(), shard by shard.
+        """
+        self._fold(self.cls.add, iterable, kwds)
+
+    def subtract(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.subtract(), shard by shard.
+        """
+        self._fold(self.cls.subtract, iterable, kwds)
+
+    def most_common(self, n=None, count_func=None, inverse=False):
+        """ Like AdvancedCounter.most_common(). For a given n, the n most
+            common of each shard are collected first.
+        """
+        if count_func is None:
+            count_func = itemgetter(1)
+        if n is None:
+            return sorted(self.iteritems(), key=count_func, reverse=not inverse)
+        tops = self._map(self.cls.most_common, self.shards, repeat(n),
+                         repeat(count_func), repeat(inverse))
+        select = nsmallest if inverse else nlargest
+        return select(n, chain.from_iterable(tops), key=count_func)
+
+    def elements(self):
+        """ Like AdvancedCounter.elements().
+        """
+        return chain.from_iterable(shard.elements() for shard in self.shards)
+
+    def _shardwise(self, other, op):
+        """ A new ShardedCounter of op applied to each shard and the
+            matching counts of other (or other itself, if it is a scalar).
+        """
+        others = self._aligned(other)
+        if others is None:
+            others = repeat(other)
+        return self._new(self._map(op, self.shards, others))
+
+    def __add__(self, other):
+        """ Add the counts, skip if <= 0.
+        """
+        return self._shardwise(other, add)
+
+    def __sub__(self, other):
+        """ Subtract count, but keep only results with positive counts.
+        """
+        return self._shardwise(other, sub)
+
+    def __or__(self, other):
+        """ Union is the maximum of value in either of the input counters.
+        """
+        return self._shardwise(other, or_)
+
+    def __and__(self, other):
+        """ Intersection is the minimum of corresponding counts.
+        """
+        return self._shardwise(other, and_)
+
+    def __iadd__(self, other):
+        self.shards = self._shardwise(other, add).shards
+        return self
+
+    def __isub__(self, other):
+        self.shards = self._shardwise(other, sub).shards
+        return self
@@ -0,0 +1,280 @@
+""" Fixed memory sketches of counters. """
+from collections import Mapping
+from itertools import izip
+from operator import add
+from math import ceil, e, log
+from acount import AdvancedCounter
+from tools import tally, iter_chunks, mix64
+
+
+class CountMinSketch(object):
+    """ Estimates the counts of any number of elements in fixed memory:
+        a table of depth rows of width counters, each element hashed to
+        one counter per row. The estimate of a count is the minimum over
+        its counters, which overestimates by more than e * total / width
+        with probability e ** -depth at most (see fromerror).
+
+        add() and subtract() work like with AdvancedCounter, though after
+        subtracting, estimates are no longer guaranteed to be upper bounds.
+        Sketches with the same width, depth and seed can be merged with +
+        (counting both inputs) and | (the maximum of both, elementwise).
+        Hashing relies on hash(), so sketches only merge across processes
+        sharing the same hash randomization setting.
+    """
+    __chunksize__ = 1 << 16
+
+    def __init__(self, iterable=None, width=2048, depth=5, seed=0, **kwds):
+        """ Create a new, empty sketch. And if given, count elements from an
+            input iterable. Or, add in the counts of a mapping.
+        """
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0
+        self.table = [[0] * width for _ in xrange(depth)]
+        self.add(iterable, **kwds)
+
+    @classmethod
+    def fromerror(cls, epsilon=0.001, delta=0.01, seed=0):
+        """ An empty sketch whose estimates are off by more than epsilon
+            * total with probability delta at most.
+        """
+        width = int(ceil(e / epsilon))
+        depth = int(ceil(log(1.0 / delta)))
+        return cls(width=width, depth=depth, seed=seed)
+
+    def _columns(self, elem):
+        """ The counter of elem in each row.
+        """
+        h, seed, width = hash(elem), self.seed, self.width
+        return [mix64(h, seed + row) % width for row in xrange(self.depth)]
+
+    def _count(self, elem, count):
+        for row, col in izip(self.table, self._columns(elem)):
+            row[col] += count
+        self.total += count
+
+    def __getitem__(self, elem):
+        """ The estimated count of elem.
+        """
+        return min(row[col] for row, col in izip(self.table, self._columns(elem)))
+
+    def __contains__(self, elem):
+        return self[elem] != 0
+
+    def get(self, elem, default=None):
+        count = self[elem]
+        return count if count else default
+
+    def add(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.add(): count the elements of an iterable,
+            or add in the counts of a mapping.
+        """
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                for elem, count in iterable.iteritems():
+                    self._count(elem, count)
+            else: # count in bulk, then hash once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    for elem, count in tally(chunk).iteritems():
+                        self._count(elem, count)
+        if kwds:
+            self.add(kwds)
+
+    def subtract(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.subtract().
+        """
+        if iterable is not None:
+            if not isinstance(iterable, Mapping):
+                iterable = tally(iterable)
+            for elem, count in iterable.iteritems():
+                self._count(elem, -count)
+        if kwds:
+            self.subtract(kwds)
+
+    def to_counter(self, elements, cls=AdvancedCounter):
+        """ A real counter of the estimated counts of the given elements.
+            Elements estimated at zero are left out.
+        """
+        result = cls()
+        for elem in set(elements):
+            count = self[elem]
+            if count:
+                result[elem] = count
+        return result
+
+    def copy(self):
+        result = self.__class__(width=self.width, depth=self.depth, seed=self.seed)
+        result.table = [row[:] for row in self.table]
+        result.total = self.total
+        return result
+
+    def __repr__(self):
+        return '%s(width=%r, depth=%r, seed=%r)' % (
+            self.__class__.__name__, self.width, self.depth, self.seed)
+
+    def __eq__(self, other):
+        if not isinstance(other, CountMinSketch):
+            return NotImplemented
+        return (self.width, self.depth, self.seed, self.table) == \
+               (other.width, other.depth, other.seed, other.table)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def _merge(self, other, op):
+        """ A new sketch with op applied to each pair of counters.
+        """
+        if not isinstance(other, CountMinSketch):
+            return NotImplemented
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("cannot merge sketches of different width, depth or seed")
+        result = self.__class__(width=self.width, depth=self.depth, seed=self.seed)
+        result.table = [map(op, row, orow) for row, orow in izip(self.table, other.table)]
+        result.total = op(self.total, other.total)
+        return result
+
+    def __add__(self, other):
+        """ Sketch of both inputs counted together.
+        """
+        return self._merge(other, add)
+
+    def __or__(self, other):
+        """ Elementwise maximum, an upper bound of the maximum of the inputs.
+        """
+        return self._merge(other, max)
+
+    def __iadd__(self, other):
+        """ Merge in another sketch, or add in a mapping or iterable.
+        """
+        if isinstance(other, CountMinSketch):
+            return self + other
+        self.add(other)
+        return self
+
+
+_INVERSE_POWERS = [2.0 ** -rank for rank in xrange(65)]
+
+class HyperLogLog(object):
+    """ Estimates the number of distinct elements seen, in fixed memory:
+        2 ** precision one byte registers, with a standard error of about
+        1.04 / sqrt(2 ** precision) (1.6% for the default of 12).
+
+        Fill it with elements like AdvancedCounter.add(), or with the keys
+        of counters. Sketches of the same precision and seed merge with |
+        (or +) into the sketch of the union, so distinct counts can be had
+        across shards. HyperLogLog.buckets() sketches the sets of a pivot.
+        As with CountMinSketch, hashing relies on hash().
+    """
+    __chunksize__ = 1 << 16
+
+    def __init__(self, iterable=None, precision=12, seed=0, **kwds):
+        """ Create a new, empty sketch. And if given, add the elements of an
+            iterable, or the keys of a mapping.
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("precision has to be within 4 and 16, not %r" % (precision,))
+        self.precision = precision
+        self.seed = seed
+        self.registers = bytearray(1 << precision)
+        self.add(iterable, **kwds)
+
+    @classmethod
+    def buckets(cls, pivot, precision=12, seed=0):
+        """ A dict of the counts of a pivot table to sketches of their sets.
+        """
+        return dict((count, cls(elem_set, precision, seed))
+                    for count, elem_set in pivot.iteritems())
+
+    def add(self, iterable=None, **kwds):
+        """ Like AdvancedCounter.add(), but only which elements were seen is
+            kept. For a mapping, its keys are added (whatever their counts).
+        """
+        if iterable is not None:
+            if isinstance(iterable, Mapping):
+                self._add_all(iterable)
+            else: # drop the duplicates of a chunk before hashing
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    self._add_all(set(chunk))
+        if kwds:
+            self.add(kwds)
+
+    def _add_all(self, elements):
+        registers, seed = self.registers, self.seed
+        shift = 64 - self.precision
+        low = (1 << shift) - 1
+        for elem in elements:
+            h = mix64(hash(elem), seed)
+            slot = h >> shift
+            rank = shift - (h & low).bit_length() + 1
+            if rank > registers[slot]:
+                registers[slot] = rank
+
+    def cardinality(self):
+        """ The estimated number of distinct elements, as a float.
+            Small cardinalities are estimated by linear counting.
+        """
+        registers = self.registers
+        m = len(registers)
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, registers))
+        if estimate <= 2.5 * m:
+            zeros = registers.count(b'\0')
+            if zeros:
+                return m * log(float(m) / zeros)
+        return estimate
+
+    def __len__(self):
+        """ The estimated number of distinct elements.
+        """
+        return int(round(self.cardinality()))
+
+    def copy(self):
+        result = self.__class__(precision=self.precision, seed=self.seed)
+        result.registers[:] = self.registers
+        return result
+
+    def __repr__(self):
+        return '%s(precision=%r, seed=%r)' % (
+            self.__class__.__name__, self.precision, self.seed)
+
+    def __eq__(self, other):
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        return (self.precision, self.seed, self.registers) == \
+               (other.precision, other.seed, other.registers)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __or__(self, other):
+        """ Sketch of the union of both inputs.
+        """
+        if not isinstance(other, HyperLogLog):
+            return NotImplemented
+        if (self.precision, self.seed) != (other.precision, other.seed):
+            raise ValueError("cannot merge sketches of different precision or seed")
+        result = self.__class__(precision=self.precision, seed=self.seed)
+        result.registers[:] = bytearray(map(max, self.registers, other.registers))
+        return result
+
+    __add__ = __or__
+
+    def __ior__(self, other):
+        """ Merge in another sketch, or add in a mapping or iterable.
+        """
+        if isinstance(other, HyperLogLog):
+            return self | other
+        self.add(other)
+        return self
+
+    __iadd__ = __ior__
@@ -1,5 +1,8 @@
 import pytest
 
+from countlib import AdvancedCounter
+from countlib import ExtremeCounter
+
 def test_elements(TestCounter, test_string):
     a = TestCounter(test_string)
     assert sorted(a.elements()) == sorted(test_string)
@@ -55,6 +58,19 @@ def test_most_common_counts_dynamic(TestCounter, test_string):
     assert sorted(tst.most_common_counts(len(tst))) == mc
     assert tst.most_common_counts(len(tst)-1) != mc
 
+def test_most_common_counts_select(TestCounter, test_listlike):
+    tst = TestCounter(test_listlike)
+    by_count = lambda item: item[1]
+    for n in range(-1, 6):
+        for inverse in (False, True):
+            walked = tst.most_common_counts(n, None, by_count, inverse)
+            assert tst.most_common_counts(n, inverse=inverse) == walked
+
+def test_most_common_counts_unhashable():
+    x = AdvancedCounter({'a': [1], 'b': [2], 'c': [2]})
+    assert sorted(x.most_common_counts(1)) == [('b', [2]), ('c', [2])]
+    assert x.most_common_counts(1, inverse=True) == [('a', [1])]
+
 def test_transpose(TestCounter):
     x = TestCounter("yay? nice!! this thing works!")
     assert isinstance(x.transpose(), TestCounter)
@@ -129,6 +145,122 @@ def test_copy(TestCounter):
     assert b != a
 
 
+def test_iter_add(TestCounter, test_listlike):
+    counter = TestCounter()
+    steps = counter.iter_add(iter(test_listlike), batch_size=2)
+    for done in steps:
+        assert done <= len(test_listlike)
+        assert counter == TestCounter(test_listlike[:done])
+    assert counter == TestCounter(test_listlike)
+
+def test_feeder(TestCounter, test_listlike):
+    counter = TestCounter()
+    sink = counter.feeder(batch_size=3)
+    for i, elem in enumerate(test_listlike):
+        sink.send(elem)
+        assert counter == TestCounter(test_listlike[:(i + 1) // 3 * 3])
+    sink.close()
+    assert counter == TestCounter(test_listlike)
+    assert counter.keys() == TestCounter(test_listlike).keys()
+
+def test_lazy(TestCounter, binop):
+    char, name, opfunc, countop = binop
+    left = TestCounter({"a": 3, "b": 1, "c": 6, "d": 2})
+    middle = TestCounter({"b": 2, "c": 1, "e": 4})
+    right = TestCounter({"a": 1, "c": 2, "e": 1, "f": 5})
+    lazy = opfunc(opfunc(left.lazy(), middle), right).evaluate()
+    assert lazy == opfunc(opfunc(left, middle), right)
+    assert lazy.__class__ is TestCounter
+    assert opfunc(left.lazy(), 2).evaluate() == opfunc(left, 2)
+    assert opfunc(left.lazy(), {"a": 2, "z": 1}).evaluate() == opfunc(left, {"a": 2, "z": 1})
+
+def test_lazy_chain(TestCounter):
+    a, b = TestCounter("abracadabra"), TestCounter("alakazam")
+    c, d, e = TestCounter("abba"), TestCounter("cabaret" * 3), TestCounter({"k": -1, "z": 2})
+    assert ((a.lazy() + b - c) & d | e).evaluate() == (a + b - c) & d | e
+    assert ((a.lazy() - a) + a).evaluate() == a
+    assert (a.lazy() * 2 + b).evaluate(dict) == a * 2 + b
+    assert (2 * a.lazy()).evaluate() == a * 2
+    assert (a.lazy() >> b << 1).evaluate() == a >> b << 1
+    assert (a.lazy() + 1 - b).evaluate() == a + 1 - b
+    assert (a.lazy() * 0 + b | a // 2).evaluate() == a * 0 + b | a // 2
+    assert (a.lazy() + b + c + d + e).evaluate() == a + b + c + d + e
+
+def test_snapshot(TestCounter):
+    counter = TestCounter("abracadabra")
+    before = dict(counter)
+    snap = counter.snapshot()
+    assert snap == before
+    counter["a"] += 1
+    counter["z"] = 3
+    del counter["b"]
+    counter += {"c": 2, "d": -1}
+    counter.subtract("r")
+    counter.update({"q": 1})
+    counter.setdefault("y", 2)
+    counter.pop("z")
+    assert snap == before
+    assert len(snap) == len(before)
+    assert sorted(snap) == sorted(before)
+    assert snap["b"] == 2 and snap["z"] == 0 and "z" not in snap
+    assert snap.get("q", "nope") == "nope"
+    assert snap.most_common(1) == [("a", 5)]
+    assert sorted(snap.elements()) == sorted("abracadabra")
+    assert snap.to_counter().__class__ is TestCounter
+    counter.clear()
+    assert snap == before and not counter
+
+def test_snapshots(TestCounter):
+    counter = TestCounter("abc")
+    first = counter.snapshot()
+    counter["a"] = 5
+    second = counter.snapshot()
+    counter["a"] = 7
+    del counter["b"]
+    third = counter.snapshot()
+    counter.add("bbd")
+    assert first == {"a": 1, "b": 1, "c": 1}
+    assert second == {"a": 5, "b": 1, "c": 1}
+    assert third == {"a": 7, "c": 1}
+    assert counter == {"a": 7, "b": 2, "c": 1, "d": 1}
+    del first, second
+    assert third == {"a": 7, "c": 1}
+    del third
+    counter["a"] = 1
+    assert counter._head is None
+
+def test_snapshot_slices():
+    counter = ExtremeCounter("abbcccdddd")
+    snap = counter.snapshot()
+    del counter[2:4]
+    counter.popitem()
+    assert snap == ExtremeCounter("abbcccdddd")
+    counter.build_index()
+    snap = counter.snapshot()
+    del counter[:10]
+    assert not counter
+    assert len(snap) == 1
+
+def test_snapshot_dropped(TestCounter):
+    for write in (lambda c: c.update({'a': 5, 'b': 0}), lambda c: c.clear(),
+                  lambda c: c.__iadd__(1), lambda c: c.add({'x': 2, 'y': 3})):
+        counter = TestCounter('abc')
+        snap = counter.snapshot()
+        del snap
+        write(counter)
+        assert counter._head is None
+
+def test_snapshot_add_itself(TestCounter):
+    counter = TestCounter('abc')
+    counter += counter.snapshot()
+    assert counter == {'a': 2, 'b': 2, 'c': 2}
+    counter.add(counter.snapshot())
+    assert counter == {'a': 4, 'b': 4, 'c': 4}
+    snap = counter.snapshot()
+    for elem in snap:
+        counter[elem + elem] = 1
+    assert sorted(snap) == ['a', 'b', 'c']
+
 if __name__ == '__main__':
     import pytest
     pytest.main()
@@ -0,0 +1,53 @@
+import pytest
+
+from threading import Thread
+from countlib import ConcurrentCounter
+from countlib import AdvancedCounter
+
+def run_threads(target, n=8):
+    threads = [Thread(target=target, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def test_like_sharded(test_listlike, test_string):
+    counter = ConcurrentCounter(test_listlike, shards=4)
+    plain = AdvancedCounter(test_listlike)
+    other = AdvancedCounter(test_string)
+    assert counter == plain
+    assert set(counter) == set(plain)
+    assert AdvancedCounter(counter.elements()) == AdvancedCounter(plain.elements())
+    assert counter + other == plain + other
+    assert counter & ConcurrentCounter(other, shards=4) == plain & other
+    counter += ConcurrentCounter(other, shards=4)
+    assert counter == plain + other
+    counter -= other
+    assert counter == (plain + other) - other
+    counter += counter
+    assert counter == ((plain + other) - other) * 2
+    counter.clear()
+    assert not counter
+
+def test_increment():
+    counter = ConcurrentCounter(shards=2)
+    assert counter.increment('a') == 1
+    assert counter.increment('a', 4) == 5
+    counter['b'] = 2
+    assert counter.pop('b') == 2 and counter.setdefault('c', 3) == 3
+    del counter['c']
+    assert counter == AdvancedCounter(a=5)
+
+def test_threads():
+    counter = ConcurrentCounter(shards=4)
+    words = "no update of any thread gets lost".split()
+    def work(i):
+        for _ in range(200):
+            counter.add(words)
+            counter.increment(i)
+        counter.subtract(words[:1])
+    run_threads(work)
+    expect = AdvancedCounter(words * 1600)
+    expect.subtract(words[:1] * 8)
+    expect.add(dict.fromkeys(range(8), 200))
+    assert counter == expect
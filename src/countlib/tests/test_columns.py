@@ -0,0 +1,69 @@
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from countlib import columns
+from countlib import AdvancedCounter
+from countlib import ExtremeCounter
+from countlib import PivotCounter
+from countlib import CoolPivotCounter
+
+def test_counter_roundtrip(TestCounter, test_iterable):
+    counter = TestCounter(test_iterable)
+    keys, counts = columns.to_columns(counter)
+    assert len(keys) == len(counts) == len(counter)
+    loaded = columns.from_columns(keys, counts, TestCounter)
+    assert loaded == counter
+    assert loaded.__class__ is TestCounter
+    assert columns.from_records(columns.to_records(counter)) == counter
+
+def test_column_types():
+    keys, counts = columns.to_columns(AdvancedCounter("abracadabra"))
+    assert counts.dtype == numpy.int64
+    keys, counts = columns.to_columns(AdvancedCounter([1, 2, 2, 1 << 40]))
+    assert keys.dtype == numpy.int64
+    for odd in ({("a", 1): 2, "b": 3}, {1 << 70: 1, 2: 2}, {u"x": 0.5, u"y": 1 << 70}):
+        counter = AdvancedCounter(odd)
+        keys, counts = columns.to_columns(counter)
+        assert columns.from_columns(keys, counts) == counter
+        assert list(keys) == counter.keys()
+
+def test_odd_counts():
+    for odd in ({"a": 0.5, "b": 2.7}, {"a": "7", "b": 1}, {"a": 1.0}, {"a": True}, {"a": [1]}):
+        counter = AdvancedCounter(odd)
+        loaded = columns.from_columns(*columns.to_columns(counter))
+        assert loaded == counter
+        assert map(type, loaded.values()) == map(type, counter.values())
+        assert columns.from_records(columns.to_records(counter)) == counter
+
+def test_nul_keys():
+    for counter in (AdvancedCounter({"a\x00": 1, "ab": 2}), AdvancedCounter({u"a\x00": 1, u"a": 2})):
+        assert columns.from_columns(*columns.to_columns(counter)) == counter
+        assert columns.from_records(columns.to_records(counter)) == counter
+        pivot = PivotCounter(counter)
+        assert columns.from_columns(*columns.to_columns(pivot), cls=PivotCounter) == pivot
+
+def test_records():
+    counter = ExtremeCounter("mississippi")
+    records = columns.to_records(counter)
+    assert records.dtype.names == ('key', 'count')
+    assert dict(zip(records['key'], records['count'])) == counter
+    assert columns.from_records(records, ExtremeCounter).__class__ is ExtremeCounter
+    counter = ExtremeCounter([3, 1, 4, 1, 5, 9, 2, 6, 5, 3, 5])
+    records = columns.to_records(counter)
+    loaded = columns.from_records(numpy.frombuffer(records.tobytes(), records.dtype))
+    assert loaded == counter
+
+def test_pivot_roundtrip(TestPivotCounter, test_iterable):
+    counter = AdvancedCounter(test_iterable)
+    pivot = TestPivotCounter(counter)
+    keys, counts = columns.to_columns(pivot)
+    assert len(keys) == len(counter)
+    assert columns.from_columns(keys, counts) == counter
+    loaded = columns.from_columns(keys, counts, TestPivotCounter)
+    assert loaded == pivot
+    assert all(isinstance(v, type(pivot.get(k))) for k, v in loaded.iteritems())
+
+def test_empty():
+    assert columns.from_records(columns.to_records(AdvancedCounter())) == {}
+    assert columns.from_columns(*columns.to_columns(PivotCounter()), cls=CoolPivotCounter) == {}
@@ -116,3 +116,82 @@ def test___ixor__(cnt_abc):
     assert cnt_inp
     assert not +cnt_inp
 
+
+def test_inplace_like_binary(TestCounter, binop):
+    char, fname, op_func, op_emul = binop
+    fname = "__i" + fname[2:]
+    left = {"a": 3, "b": 1, "c": -2, "d": 2, "e": 0}
+    for right in ({"a": 2, "c": 1, "d": 3, "f": 4}, Counter("abf"), TestCounter({"b": 2, "z": 1}), 2):
+        expected = op_func(TestCounter(left), right)
+        counter = TestCounter(left)
+        assert getattr(counter, fname)(right) is counter
+        assert counter == expected
+    counter = TestCounter({"a": 3, "b": 1})
+    expected = op_func(counter, counter.copy())
+    assert getattr(counter, fname)(counter) == expected
+
+def test__isub__mapping(TestCounter):
+    c = TestCounter("abbccc")
+    c -= {"a": 1, "b": 3, "c": 1, "d": -2}
+    assert c == TestCounter({"c": 2, "d": 2})
+
+def test_inplace_index():
+    from countlib import ExtremeCounter
+    c = ExtremeCounter("abbcccdddd")
+    c.build_index()
+    c += {"a": 5, "e": 2}
+    c -= {"d": 4}
+    c &= {"a": 4, "b": 3, "c": 1, "e": 7}
+    assert c == ExtremeCounter({"a": 4, "b": 2, "c": 1, "e": 2})
+    assert [count for elem, count in c.most_common()] == sorted(c.values(), reverse=True)
+
+def test_inplace_delta(TestCounter):
+    import random
+    rnd = random.Random(22)
+    counter = TestCounter(rnd.choice("abcdefgh") for _ in range(200))
+    mirror = dict(counter)
+    for step in range(300):
+        elem, count = rnd.choice("abcdefghij"), rnd.randint(-4, 4)
+        action = rnd.choice(("set", "add", "subtract", "update", "setdefault", "iadd", "isub", "ior"))
+        if action == "set":
+            counter[elem] = mirror[elem] = count
+        elif action == "add":
+            counter.add({elem: count})
+            mirror[elem] = mirror.get(elem, 0) + count
+        elif action == "subtract":
+            counter.subtract(elem)
+            mirror[elem] = mirror.get(elem, 0) - 1
+        elif action == "update":
+            counter.update({elem: count})
+            mirror[elem] = count
+        elif action == "setdefault":
+            counter.setdefault(elem, count)
+            mirror.setdefault(elem, count)
+        else:
+            delta = {elem: count}
+            expected = {"iadd": TestCounter(mirror) + delta, "isub": TestCounter(mirror) - delta,
+                        "ior": TestCounter(mirror) | delta}[action]
+            getattr(counter, "__%s__" % action)(delta)
+            mirror = dict(expected)
+        assert counter == mirror
+
+def test_write_hook(TestCounter):
+    import pickle
+    counter = TestCounter("abbccc")
+    assert type(counter) is TestCounter # plain writes, nothing to note
+    counter += {"a": 1}
+    assert type(counter) is not TestCounter and counter.__class__ is TestCounter
+    counter["b"] = -1
+    counter += {"c": 1}
+    assert counter == {"a": 2, "c": 4}
+    assert (counter + counter).__class__ is TestCounter
+    assert pickle.loads(pickle.dumps(counter, 2)).__class__ is TestCounter
+    assert repr(counter).startswith(TestCounter.__name__)
+    counter.update({"d": 0})
+    assert type(counter) is TestCounter
+    snapshot = counter.snapshot()
+    counter["a"] = 7
+    assert snapshot["a"] == 2
+    del snapshot
+    counter["a"] = 8
+    assert type(counter) is TestCounter
@@ -1,5 +1,7 @@
 import pytest
 
+import random
+from operator import add, sub, or_, and_
 from countlib import AdvancedCounter
 from countlib import ExtremeCounter
 from collections import Counter
@@ -117,6 +119,23 @@ def test___xor__(TestCounter):
     assert TestCounter('abbb') ^ Counter('bcc') == TestCounter('abbcc')
     assert TestCounter('abbbcc') ^ Counter('bcac') == Counter({'b': 2})
 
+def test_merge_like_counter(TestCounter):
+    rnd = random.Random(4)
+    for _ in range(20):
+        a = dict((k, rnd.randint(-5, 5)) for k in rnd.sample("abcdefghij", 7))
+        b = dict((k, rnd.randint(-5, 5)) for k in rnd.sample("abcdefghij", 7))
+        for op in (add, sub, or_, and_):
+            expected = op(Counter(a), Counter(b))
+            assert op(TestCounter(a), TestCounter(b)) == expected
+            assert op(TestCounter(a), Counter(b)) == expected
+            assert op(TestCounter(a), b) == expected
+
+def test_merge_result_class(TestCounter):
+    for op in ("+", "-", "*", "//", "%", "**", "|", "&", "^", ">>", "<<"):
+        for other in (TestCounter("bcc"), 2):
+            x = eval("TestCounter('abbb') %s other" % op)
+            assert x.__class__ == TestCounter
+
 if __name__ == '__main__':
     import pytest
     pytest.main()
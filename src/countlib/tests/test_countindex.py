@@ -0,0 +1,59 @@
+import pytest
+
+from countlib.countindex import CountIndex
+from countlib import ExtremeCounter
+from countlib import PivotCounter
+
+@pytest.fixture
+def index():
+    return CountIndex(ExtremeCounter("abcabbcccddeefgggggghiii"))
+
+def test_init(index):
+    assert index == PivotCounter("abcabbcccddeefgggggghiii")
+    assert index.counts == [1, 2, 3, 4, 6]
+    assert not CountIndex().counts
+
+def test_missing(index):
+    assert not index[5]
+    assert 5 not in index
+
+def test_insert_discard(index):
+    index.insert("x", 5)
+    index.insert("y", 1)
+    assert index.counts == [1, 2, 3, 4, 5, 6]
+    assert index[1] == set("fhy")
+    index.discard("x", 5)
+    index.discard("x", 5)
+    index.discard("g", 6)
+    assert index.counts == [1, 2, 3, 4]
+    assert 6 not in index
+
+def test_move(index):
+    index.move("c", 4, 4)
+    assert "c" in index[4]
+    index.move("c", 4, 7)
+    assert index.counts == [1, 2, 3, 6, 7]
+    assert index[7] == set("c")
+
+def test_ranges(index):
+    assert index.count_range() == [1, 2, 3, 4, 6]
+    assert index.count_range(2, 4) == [2, 3]
+    assert index.count_range(2, 4, invert=True) == [1, 4, 6]
+    assert index.count_range(5, 2) == []
+    assert index.count_range(5, 2, invert=True) == [1, 2, 3, 4, 6]
+    assert index.count_range(None, 2) == [1]
+    assert index.count_range(5) == [6]
+    assert sorted(index.iter_range(3, 5)) == [("b", 3), ("c", 4), ("i", 3)]
+
+def test_clear(index):
+    index.clear()
+    assert not index
+    assert not index.counts
+
+def test_top():
+    index = CountIndex({'a': 3, 'b': 1, 'c': 3, 'd': 2})
+    assert index.top(0) == [] and index.top(-1) == []
+    assert sorted(index.top(2)) == [('a', 3), ('c', 3)]
+    assert index.top(3)[2] == ('d', 2)
+    assert index.top(1, lowest=True) == [('b', 1)]
+    assert len(index.top()) == 4 and len(index.top(10)) == 4
@@ -0,0 +1,160 @@
+import pytest
+import random
+
+numpy = pytest.importorskip("numpy")
+
+from countlib import AdvancedCounter
+from countlib import DenseCounter
+
+def positive(counter):
+    return dict((k, v) for k, v in counter.iteritems() if v)
+
+@pytest.fixture
+def ints():
+    return [ random.randint(0, 40) for _ in range(300) ]
+
+@pytest.fixture
+def more_ints():
+    return [ random.randint(10, 60) for _ in range(300) ]
+
+def test_init(ints):
+    d = DenseCounter(ints)
+    assert d == AdvancedCounter(ints)
+    assert DenseCounter(AdvancedCounter(ints)) == d
+    assert DenseCounter(d) == d
+    assert DenseCounter(iter(ints)) == d
+    assert not DenseCounter()
+    assert DenseCounter(size=10).counts.shape == (10,)
+
+def test_bad_elements():
+    for bad in (["a"], [-1], {-2: 1}):
+        try:
+            DenseCounter(bad)
+            assert False
+        except (TypeError, ValueError):
+            pass
+    d = DenseCounter()
+    try:
+        d["x"] = 1
+        assert False
+    except TypeError:
+        pass
+
+def test_mapping(ints):
+    d, a = DenseCounter(ints), AdvancedCounter(ints)
+    assert len(d) == len(a)
+    assert sorted(d) == sorted(a)
+    assert sorted(d.items()) == sorted(a.items())
+    assert d[1000] == d["x"] == 0
+    assert 1000 not in d
+    assert d.get(1000, "nope") == "nope"
+    for k in a:
+        assert d[k] == a[k]
+        assert type(d[k]) in (int, long)
+    d[70] = 3
+    assert d[70] == 3
+    del d[70]
+    del d[71]
+    assert 70 not in d
+    assert eval(repr(d)) == d
+
+def test_add_subtract(ints, more_ints):
+    d, a = DenseCounter(ints), AdvancedCounter(ints)
+    d.add(more_ints)
+    a.add(more_ints)
+    assert d == a
+    d.subtract(ints * 2)
+    a.subtract(ints * 2)
+    assert positive(d) == positive(a)
+    d.add({3: 2, 100: 1})
+    a.add({3: 2, 100: 1})
+    assert positive(d) == positive(a)
+
+def test_elements(ints):
+    d = DenseCounter(ints)
+    d[50] = -3
+    assert sorted(d.elements()) == sorted(ints)
+
+def test_most_common(ints):
+    d, a = DenseCounter(ints), AdvancedCounter(ints)
+    assert sorted(d.most_common()) == sorted(a.most_common())
+    for n in (0, 1, 3, 10, 100):
+        assert [c for e, c in d.most_common(n)] == [c for e, c in a.most_common(n)]
+    assert DenseCounter([1, 1, 2, 2, 3]).most_common(2) == [(1, 2), (2, 2)]
+    unsigned = DenseCounter([3, 1, 1, 2, 2, 2], dtype=numpy.uint64)
+    assert unsigned.most_common() == [(2, 3), (1, 2), (3, 1)]
+    assert unsigned.most_common(1) == [(2, 3)]
+
+def test_binops(ints, more_ints, binop):
+    char, fname, op_func, op_emul = binop
+    if char not in ("+", "-", "*", "/", "//", "|", "&"):
+        return
+    a, b = AdvancedCounter(ints), AdvancedCounter(more_ints)
+    expected = positive(op_func(a, b))
+    assert positive(op_func(DenseCounter(ints), DenseCounter(more_ints))) == expected
+    assert positive(op_func(DenseCounter(ints), b)) == expected
+
+def test_scalars(ints, right_operand):
+    d, a = DenseCounter(ints), AdvancedCounter(ints)
+    assert positive(d + right_operand) == positive(a + right_operand)
+    assert positive(d - right_operand) == positive(a - right_operand)
+    assert positive(d * right_operand) == positive(a * right_operand)
+    assert positive(d // right_operand) == positive(a // right_operand)
+    assert positive(d | right_operand) == positive(a | right_operand)
+    assert positive(d & right_operand) == positive(a & right_operand)
+    assert positive(d / right_operand) == positive(a / right_operand)
+    assert positive(d / float(right_operand)) == positive(a / float(right_operand))
+    assert positive(d.__truediv__(right_operand)) == positive(a.__truediv__(right_operand))
+    assert positive(right_operand - d) == positive(right_operand - a)
+    assert DenseCounter([1, 1, 1, 2]) / 2.0 == {1: 1.5, 2: 0.5}
+    try:
+        d // 0
+        assert False
+    except ZeroDivisionError:
+        pass
+
+def test_float_counts():
+    d = DenseCounter([1, 1, 2])
+    assert d * {1: 0.5} == AdvancedCounter([1, 1, 2]) * {1: 0.5} == {1: 1.0}
+    assert {1: 2.5, 3: 1} - d == {1: 0.5, 3: 1}
+    d.add({1: 0.5})
+    assert d == {1: 2.5, 2: 1} and d.counts.dtype.kind == 'f'
+    d.subtract({2: 0.25})
+    assert d[2] == 0.75
+    small = DenseCounter([1, 2], dtype=numpy.int32)
+    small.add([2, 3])
+    assert small.counts.dtype == numpy.int32 and small == {1: 1, 2: 2, 3: 1}
+
+def test_odd_input():
+    assert DenseCounter(numpy.array([1, 2, 2], dtype=numpy.uint64)) == {1: 1, 2: 2}
+    assert DenseCounter(xrange(3)) == {0: 1, 1: 1, 2: 1}
+    for wrong in ("abc", u"abc", [0.5], {1: "x"}):
+        with pytest.raises(TypeError):
+            DenseCounter(wrong)
+
+def test_unaries(ints):
+    d = DenseCounter(ints)
+    d.subtract([1] * 100)
+    a = d.to_counter()
+    assert -d == -a
+    assert +d == +a
+    assert abs(d) == abs(a)
+
+def test_inplace(ints, more_ints):
+    d, a = DenseCounter(ints), AdvancedCounter(ints)
+    d += DenseCounter(more_ints)
+    a += AdvancedCounter(more_ints)
+    assert d == a
+    d -= DenseCounter(ints)
+    a = a - AdvancedCounter(ints)
+    assert positive(d) == positive(a)
+    d |= DenseCounter(ints)
+    d &= DenseCounter(more_ints)
+    assert d == (a | AdvancedCounter(ints)) & AdvancedCounter(more_ints)
+
+def test_intermixing(ints, more_ints):
+    d, a = DenseCounter(ints), AdvancedCounter(more_ints)
+    assert a + d == d + a
+    assert isinstance(a + d, AdvancedCounter)
+    assert isinstance(d + a, DenseCounter)
+    assert d.to_counter() == AdvancedCounter(ints)
@@ -0,0 +1,65 @@
+import pytest
+
+from countlib import AdvancedCounter
+from countlib import DecayingCounter
+
+def close(counter, expected):
+    assert set(counter) == set(expected)
+    for elem, count in expected.iteritems():
+        assert abs(counter[elem] - count) <= 1e-9 * max(1, abs(count))
+    return True
+
+def test_ticks(test_listlike):
+    counter = DecayingCounter(test_listlike, factor=0.5)
+    plain = AdvancedCounter(test_listlike)
+    assert close(counter, plain)
+    counter.tick()
+    assert close(counter, dict((k, v * 0.5) for k, v in plain.iteritems()))
+    counter.add(test_listlike)
+    counter.tick(2)
+    assert close(counter, dict((k, v * 0.375) for k, v in plain.iteritems()))
+    counter.subtract(test_listlike)
+    assert close(counter, dict((k, v * -0.625) for k, v in plain.iteritems()))
+
+def test_decay():
+    counter = DecayingCounter("abracadabra")
+    counter *= 0.5
+    counter.decay(0.5)
+    assert close(counter, {"a": 1.25, "b": 0.5, "r": 0.5, "c": 0.25, "d": 0.25})
+    assert counter.most_common(1) == [("a", 1.25)]
+    assert counter.most_common(2, inverse=True)[0][1] == 0.25
+    counter.prune(0.3)
+    assert sorted(counter) == ["a", "b", "r"]
+    assert close(counter.to_counter(), {"a": 1.25, "b": 0.5, "r": 0.5})
+
+def test_get():
+    counter = DecayingCounter("aab", factor=0.5)
+    counter.tick()
+    assert counter.get("a") == 1.0
+    assert counter.get("z") is None
+    assert counter.get("z", "nope") == "nope"
+
+def test_renormalize():
+    counter = DecayingCounter(a=1, factor=0.5)
+    for _ in range(2000):
+        counter.tick()
+        counter.add(a=1)
+    assert abs(counter["a"] - 2.0) < 1e-9
+    assert counter.landmark > 0
+    assert max(counter.raw.values()) < 1e200
+
+def test_clock():
+    clock = [100.0]
+    counter = DecayingCounter("aa", factor=0.5, clock=lambda: clock[0])
+    clock[0] += 1
+    counter.add("a")
+    clock[0] += 2
+    assert close(counter, {"a": 0.5})
+    with pytest.raises(TypeError):
+        counter.tick()
+
+def test_bad_input():
+    with pytest.raises(ValueError):
+        DecayingCounter(factor=0)
+    with pytest.raises(ValueError):
+        DecayingCounter().decay(-1)
@@ -0,0 +1,63 @@
+import pytest
+
+from countlib import MappedCounter
+from countlib import AdvancedCounter
+
+def test_count_and_reopen(tmpdir, test_string):
+    path = str(tmpdir.join("counts"))
+    plain = AdvancedCounter(test_string)
+    with MappedCounter(path, test_string, capacity=4) as mapped:
+        assert mapped == plain
+        assert len(mapped) == len(plain)
+        assert mapped['not there'] == 0 and 'not there' not in mapped
+        assert mapped[[1]] == 0 and [1] not in mapped
+        assert mapped.get('not there') is None and mapped.get([1], 'nope') == 'nope'
+        assert mapped.get(test_string[0]) == plain[test_string[0]]
+    with MappedCounter(path) as mapped:
+        assert mapped == plain
+        mapped.add(iter(test_string), extra=3)
+        mapped.subtract({'extra': 1})
+        mapped[(1, u'\xe4')] = -4
+    expect = plain * 2
+    expect.add({'extra': 2, (1, u'\xe4'): -4})
+    with MappedCounter(path) as mapped:
+        assert mapped.to_counter() == expect
+        assert sorted(mapped.elements()) == sorted(expect.elements())
+        count = lambda items: [c for e, c in items]
+        for n in (None, 0, 2):
+            for inverse in (False, True):
+                assert count(mapped.most_common(n, inverse)) == \
+                       count(expect.most_common(n, inverse=inverse))
+
+def test_growth(tmpdir):
+    path = str(tmpdir.join("counts"))
+    data = range(3000) * 2 + map(str, range(500))
+    with MappedCounter(path, data, capacity=1) as mapped:
+        assert mapped.capacity >= len(mapped) * 10 / 7
+        assert mapped.to_counter() == AdvancedCounter(data)
+    assert tmpdir.listdir(sort=True) == [tmpdir.join("counts"), tmpdir.join("counts.keys")]
+
+def test_blocks(tmpdir):
+    class SmallBlocks(MappedCounter):
+        __blocksize__ = 4
+    path = str(tmpdir.join("counts"))
+    data = range(100) * 3
+    with SmallBlocks(path, data, capacity=2) as mapped:
+        assert mapped.to_counter() == AdvancedCounter(data)
+        assert [count for elem, count in mapped.most_common(3)] == [3, 3, 3]
+
+def test_not_a_counter(tmpdir):
+    path = tmpdir.join("other")
+    path.write("x" * 64)
+    with pytest.raises(ValueError):
+        MappedCounter(str(path))
+
+def test_reopen_unclosed(tmpdir, test_string):
+    path = str(tmpdir.join("counts"))
+    mapped = MappedCounter(path, test_string, capacity=2)
+    mapped.add({"new": 2})
+    reopened = MappedCounter(path)
+    assert len(reopened) == len(mapped)
+    assert reopened.to_counter() == mapped.to_counter()
+    reopened.close()
+    mapped.close()
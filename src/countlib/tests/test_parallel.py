@@ -0,0 +1,44 @@
+import pytest
+
+from countlib import AdvancedCounter
+from countlib import ExtremeCounter
+from countlib import count_parallel
+from countlib import count_file
+from countlib.parallel import line_offsets, tree_reduce
+
+text = "the quick brown fox\njumps over\n\nthe lazy dog\nthe end\nover"
+
+def test_tree_reduce(test_listlike):
+    parts = [AdvancedCounter(test_listlike[i:]) for i in range(len(test_listlike))]
+    expect = sum(parts, AdvancedCounter())
+    assert tree_reduce(parts) == expect
+    assert tree_reduce([]) is None
+
+def test_count_parallel():
+    counted = count_parallel(iter(text), processes=2, chunksize=7)
+    assert counted == AdvancedCounter(text)
+    assert isinstance(counted, AdvancedCounter)
+    assert count_parallel([], processes=2, cls=ExtremeCounter) == ExtremeCounter()
+    for processes in (1, 3, 5):
+        assert count_parallel(iter(text), processes=processes, chunksize=3) == AdvancedCounter(text)
+    with pytest.raises(RuntimeError):
+        count_parallel([[1], [2]] * 10, processes=2, chunksize=1) # unhashable
+
+def test_line_offsets(tmpdir):
+    path = str(tmpdir.join("text"))
+    with open(path, 'wb') as f:
+        f.write(text)
+    for parts in range(1, 12):
+        offsets = line_offsets(path, parts)
+        assert offsets[0][0] == 0 and offsets[-1][1] == len(text)
+        for start, stop in offsets:
+            assert start == 0 or text[start - 1] == '\n'
+        assert ''.join(text[a:b] for a, b in offsets) == text
+
+def test_count_file(tmpdir):
+    path = str(tmpdir.join("text"))
+    with open(path, 'wb') as f:
+        f.write(text)
+    for processes in (1, 3):
+        assert count_file(path, processes, blocksize=4) == AdvancedCounter(text.split('\n'))
+        assert count_file(path, processes, words=True) == AdvancedCounter(text.split())
@@ -43,6 +43,11 @@ def test_mutable_copy():
     assert not e == d
     assert e == d + PivotCounter()
 
+def test_mutable_merge():
+    c = PivotCounter('which')
+    c.merge(PivotCounter('boof'), CoolPivotCounter('abc'))
+    assert c == PivotCounter({1: ['a', 'b', 'c', 'f', 'i', 'w'], 2: ['h', 'o']})
+
 ###### CoolPivot tests ######
 
 def test_frozen_class():
@@ -88,6 +93,20 @@ def test_frozen_copy():
         CoolPivotCounter({1: ['c', 'i', 'w'], 2: ['h']})
     )
 
+def test_frozen_update_many():
+    c = CoolPivotCounter(dict.fromkeys(range(1000), 1))
+    c.update({5000: 1, 5001: 2})
+    assert len(c[1]) == 1001 and c[2] == frozenset([5001])
+    assert isinstance(c[1], frozenset)
+
+def test_frozen_merge():
+    c = CoolPivotCounter('which')
+    c.merge(CoolPivotCounter('boof'), PivotCounter('abc'))
+    assert c == CoolPivotCounter({1: ['a', 'b', 'c', 'f', 'i', 'w'], 2: ['h', 'o']})
+    assert all(isinstance(s, frozenset) for s in c.values())
+    c.merge()
+    assert len(c) == 2
+
 if __name__ == '__main__':
     import pytest
     pytest.main()
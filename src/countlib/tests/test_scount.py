@@ -0,0 +1,62 @@
+import pytest
+import random
+
+from countlib import SpaceSavingCounter
+from countlib import AdvancedCounter
+
+def skewed(seed, size=5000):
+    rnd = random.Random(seed)
+    return [int(rnd.paretovariate(1.0)) for _ in xrange(size)]
+
+def check_bounds(summary, data):
+    true = AdvancedCounter(data)
+    assert summary.total == len(data)
+    assert len(summary) <= summary.capacity
+    for elem, count in summary.iteritems():
+        assert summary.guaranteed(elem) <= true[elem] <= count
+    for elem, count in true.iteritems():
+        if count > len(data) / summary.capacity:
+            assert elem in summary
+        if elem not in summary:
+            assert count <= summary.floor()
+
+def test_exact_below_capacity(test_listlike):
+    summary = SpaceSavingCounter(test_listlike, capacity=100)
+    assert dict(summary) == dict(AdvancedCounter(test_listlike))
+    assert not summary.errors
+    assert summary.floor() == 0
+
+def test_bounds():
+    data = skewed(1)
+    for capacity in (1, 5, 20, 100):
+        summary = SpaceSavingCounter(capacity=capacity)
+        summary.add(iter(data))
+        check_bounds(summary, data)
+    top = SpaceSavingCounter(data, capacity=20).most_common(3)
+    assert [e for e, c in top] == [e for e, c in AdvancedCounter(data).most_common(3)]
+
+def test_merge():
+    left, right = skewed(2), skewed(3)
+    merged = SpaceSavingCounter(left, capacity=20) + SpaceSavingCounter(right, capacity=20)
+    check_bounds(merged, left + right)
+    merged += SpaceSavingCounter(left, capacity=20)
+    check_bounds(merged, left + right + left)
+    union = SpaceSavingCounter(left, capacity=20) | SpaceSavingCounter(left, capacity=20)
+    check_bounds(union, left)
+
+def test_api():
+    summary = SpaceSavingCounter("abbccc", capacity=2, d=5)
+    assert summary.most_common(1)[0][0] == 'd'
+    assert summary.guaranteed('d') <= 5 <= summary['d']
+    assert summary['zzz'] == 0 and 'zzz' not in summary
+    assert summary.get('zzz', 'nope') == 'nope' and summary.get('zzz') is None
+    assert summary.get('d', 'nope') == summary['d']
+    assert sorted(summary.elements()) == sorted(AdvancedCounter(summary).elements())
+    assert repr(SpaceSavingCounter(capacity=3)) == 'SpaceSavingCounter(capacity=3)'
+    copied = summary.copy()
+    copied.add('e')
+    assert copied != summary and summary.total == 11
+    with pytest.raises(ValueError):
+        summary.add({'a': -1})
+    with pytest.raises(ValueError):
+        SpaceSavingCounter(capacity=0)
@@ -0,0 +1,90 @@
+import pytest
+
+import pickle
+import cPickle
+from collections import Counter
+from countlib import serial
+from countlib import AdvancedCounter
+from countlib import ExtremeCounter
+from countlib import PivotCounter
+from countlib import CoolPivotCounter
+
+def test_counter_roundtrip(TestCounter, test_iterable):
+    counter = TestCounter(test_iterable)
+    for chunksize in (1, 3, serial.CHUNKSIZE):
+        loaded = serial.loads(serial.dumps(counter, chunksize))
+        assert loaded == counter
+        assert loaded.__class__ is TestCounter
+    assert serial.loads(serial.dumps(counter), AdvancedCounter).__class__ is AdvancedCounter
+
+def test_count_columns():
+    for counts in ([1, 2], [300, -3], [1 << 40], [1 << 70, 1], [0.5, 2], [-(1 << 63)]):
+        counter = AdvancedCounter(dict(zip("abcd", counts)))
+        assert serial.loads(serial.dumps(counter)) == counter
+    counter = AdvancedCounter(map(str, xrange(1000)) * 3)
+    assert len(serial.dumps(counter)) < len(cPickle.dumps(counter, 2))
+
+def test_pivot_roundtrip(TestPivotCounter, test_iterable):
+    pivot = TestPivotCounter(AdvancedCounter(test_iterable))
+    for chunksize in (1, serial.CHUNKSIZE):
+        loaded = serial.loads(serial.dumps(pivot, chunksize))
+        assert loaded == pivot
+        assert loaded.__class__ is TestPivotCounter
+        assert all(isinstance(v, type(pivot.get(k))) for k, v in loaded.iteritems())
+
+def test_bool_counts():
+    for counts in ({'a': True}, {'a': True, 'b': 2}, {'a': False, 'b': 1.5}):
+        loaded = serial.loads(serial.dumps(AdvancedCounter(counts)))
+        assert loaded == counts
+        assert sorted(map(type, loaded.values())) == sorted(map(type, counts.values()))
+
+def test_keydict(TestCounter, TestPivotCounter):
+    words = [ "word%d" % i for i in xrange(300) ]
+    counter = TestCounter(words[::3] * 2 + ["other", (1, 2)])
+    for chunksize in (1, 7, serial.CHUNKSIZE):
+        data = serial.dumps(counter, chunksize, keydict=words)
+        assert serial.loads(data, keydict=words) == counter
+    assert len(serial.dumps(counter, keydict=words)) < len(serial.dumps(counter))
+    with pytest.raises(ValueError):
+        serial.loads(serial.dumps(counter, keydict=words))
+    assert serial.loads(serial.dumps(counter), keydict=words) == counter # not needed
+    pivot = TestPivotCounter(counter)
+    assert serial.loads(serial.dumps(pivot, keydict=words), keydict=words) == pivot
+    assert serial.loads(serial.dumps(TestCounter(), keydict=[]), keydict=[]) == {}
+
+def test_register():
+    class MyCounter(AdvancedCounter):
+        pass
+    counter = MyCounter("abracadabra")
+    assert serial.loads(serial.dumps(counter)).__class__ is AdvancedCounter
+    assert serial.register(MyCounter) is MyCounter
+    try:
+        assert serial.loads(serial.dumps(counter)).__class__ is MyCounter
+    finally:
+        del serial.classes['MyCounter']
+
+def test_unpivot():
+    for counter in (ExtremeCounter("mississippi"), AdvancedCounter("mississippi")):
+        pivot = PivotCounter(counter)
+        loaded = serial.loads(serial.dumps(pivot))
+        assert loaded.__unpivot__ is counter.__class__
+        assert loaded.unpivot().__class__ is counter.__class__
+        assert loaded.unpivot() == counter
+    assert serial.loads(serial.dumps(PivotCounter("abba"))).__unpivot__ is Counter
+
+def test_file(tmpdir):
+    path = str(tmpdir.join("counter"))
+    counter = AdvancedCounter("abracadabra")
+    with open(path, 'wb') as f:
+        serial.dump(counter, f)
+    with open(path, 'rb') as f:
+        assert serial.load(f) == counter
+    with pytest.raises(ValueError):
+        serial.loads("nonsense" * 3)
+
+def test_pickle(TestCounter, test_iterable):
+    counter = TestCounter(test_iterable)
+    for dumper in (pickle, cPickle):
+        for protocol in (0, 2):
+            loaded = dumper.loads(dumper.dumps(counter, protocol))
+            assert loaded == counter and loaded.__class__ is TestCounter
@@ -0,0 +1,77 @@
+import pytest
+
+from countlib import ShardedCounter
+from countlib import AdvancedCounter
+from countlib import ExtremeCounter
+from itertools import imap
+from multiprocessing.pool import ThreadPool
+
+def test_mapping(test_listlike):
+    sharded = ShardedCounter(test_listlike, shards=3)
+    plain = AdvancedCounter(test_listlike)
+    assert sharded == plain and plain == sharded
+    assert len(sharded) == len(plain)
+    assert set(sharded) == set(plain)
+    assert AdvancedCounter(sharded.elements()) == AdvancedCounter(plain.elements())
+    assert sharded['not there'] == 0 and 'not there' not in sharded
+    assert sharded.get('not there') is None
+    x, y = ('x',), ('y',)
+    sharded[x] = 3
+    assert sharded.pop(x) == 3 and sharded.pop(x, None) is None
+    assert sharded.setdefault(y, 2) == 2 and sharded[y] == 2
+    del sharded[y]
+    del sharded[y]
+    assert sharded == plain
+    copied = sharded.copy()
+    copied.clear()
+    assert not copied and sharded
+
+def test_add_subtract(test_listlike):
+    sharded = ShardedCounter(shards=4)
+    sharded.add(iter(test_listlike), extra=2)
+    sharded.add(AdvancedCounter(test_listlike))
+    expect = AdvancedCounter(test_listlike) * 2 + AdvancedCounter(extra=2)
+    assert sharded == expect
+    sharded.subtract(test_listlike * 3)
+    expect.subtract(test_listlike * 3)
+    assert sharded == expect
+
+def test_most_common(test_listlike):
+    sharded = ShardedCounter(test_listlike, shards=5)
+    plain = AdvancedCounter(test_listlike)
+    count = lambda items: [c for e, c in items]
+    for n in (None, 0, 1, 2, 10):
+        for inverse in (False, True):
+            assert count(sharded.most_common(n, inverse=inverse)) == \
+                   count(plain.most_common(n, inverse=inverse))
+
+def test_operators(test_listlike, test_string):
+    sharded = ShardedCounter(test_listlike, shards=3)
+    plain = AdvancedCounter(test_listlike)
+    other = AdvancedCounter(test_string)
+    for o in (other, dict(other), ShardedCounter(other, shards=3), ShardedCounter(other, shards=2)):
+        assert sharded + o == plain + other
+        assert sharded - o == plain - other
+        assert sharded | o == plain | other
+        assert sharded & o == plain & other
+    for scalar in (2, -1):
+        assert sharded + scalar == plain + scalar
+        assert sharded | scalar == plain | scalar
+    acc = sharded.copy()
+    acc += other
+    acc -= ShardedCounter(test_listlike, shards=3)
+    assert acc == (plain + other) - plain
+    assert isinstance(sharded + other, ShardedCounter)
+
+def test_mapper_and_cls(test_listlike):
+    pool = ThreadPool(2)
+    try:
+        sharded = ShardedCounter(test_listlike, shards=4, mapper=pool.map, cls=ExtremeCounter)
+        assert all(isinstance(shard, ExtremeCounter) for shard in sharded.shards)
+        assert sharded + sharded == AdvancedCounter(test_listlike) * 2
+    finally:
+        pool.close()
+    lazy = ShardedCounter(test_listlike, shards=2, mapper=imap)
+    assert lazy == AdvancedCounter(test_listlike)
+    with pytest.raises(ValueError):
+        ShardedCounter(shards=0)
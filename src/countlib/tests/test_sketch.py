@@ -0,0 +1,84 @@
+import pytest
+import random
+
+from countlib import CountMinSketch
+from countlib import HyperLogLog
+from countlib import PivotCounter
+from countlib import AdvancedCounter
+from countlib.tools import mix64
+
+def skewed(seed, size=5000):
+    rnd = random.Random(seed)
+    return [int(rnd.paretovariate(1.0)) for _ in xrange(size)]
+
+def test_mix64():
+    assert mix64(1) != mix64(2) and mix64(1) != mix64(1, 1)
+    assert 0 <= mix64(-1) < 2 ** 64
+    assert mix64(hash("abc"), 3) == mix64(hash("abc"), 3)
+
+def test_cms_bounds():
+    data = skewed(1)
+    sketch = CountMinSketch.fromerror(0.01, 0.01)
+    sketch.add(iter(data))
+    assert sketch.total == len(data)
+    for elem, count in AdvancedCounter(data).iteritems():
+        assert count <= sketch[elem] <= count + 0.01 * len(data)
+
+def test_cms_exact_when_wide(test_listlike):
+    sketch = CountMinSketch(test_listlike, width=4096)
+    true = AdvancedCounter(test_listlike)
+    assert sketch.to_counter(test_listlike) == true
+    sketch.subtract(test_listlike)
+    assert not sketch.to_counter(test_listlike)
+    sketch.add(true, extra=3)
+    assert sketch['extra'] == 3 and 'extra' in sketch
+
+def test_cms_merge():
+    left, right = skewed(2), skewed(3)
+    sum_sketch = CountMinSketch(left, width=64) + CountMinSketch(right, width=64)
+    assert sum_sketch == CountMinSketch(left + right, width=64)
+    acc = CountMinSketch(left, width=64)
+    acc += CountMinSketch(right, width=64)
+    assert acc == sum_sketch
+    max_sketch = CountMinSketch(left, width=64) | CountMinSketch(right, width=64)
+    for elem in set(left + right):
+        assert max_sketch[elem] >= max(left.count(elem), right.count(elem))
+    with pytest.raises(ValueError):
+        CountMinSketch(width=64) + CountMinSketch(width=64, seed=1)
+    copied = acc.copy()
+    copied.add([1])
+    assert copied != acc
+
+def test_hll_small_exact(test_listlike):
+    sketch = HyperLogLog(test_listlike)
+    assert len(sketch) == len(set(test_listlike))
+    assert len(HyperLogLog()) == 0
+
+def test_hll_estimate():
+    for size in (1000, 50000):
+        sketch = HyperLogLog(precision=10)
+        sketch.add(xrange(size))
+        sketch.add(AdvancedCounter(xrange(size / 2)))
+        assert abs(len(sketch) - size) < 0.1 * size
+
+def test_hll_merge():
+    left, right = HyperLogLog(xrange(0, 3000)), HyperLogLog(xrange(2000, 5000))
+    union = left | right
+    assert union == HyperLogLog(xrange(5000))
+    assert left + right == union
+    acc = left.copy()
+    acc |= right
+    assert acc == union and acc != left
+    acc += xrange(5000, 6000)
+    assert abs(len(acc) - 6000) < 300
+    with pytest.raises(ValueError):
+        left | HyperLogLog(precision=5)
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=3)
+
+def test_hll_buckets():
+    pivot = PivotCounter(AdvancedCounter(skewed(4)))
+    sketches = HyperLogLog.buckets(pivot)
+    assert sorted(sketches) == sorted(pivot)
+    for count, elem_set in pivot.iteritems():
+        assert abs(len(sketches[count]) - len(elem_set)) <= 0.05 * len(elem_set) + 1
@@ -0,0 +1,52 @@
+import pytest
+
+from countlib.tools import tally, fold_tally, iter_chunks, pivot_chunks
+from collections import Counter
+
+def test_tally(test_listlike):
+    counts = tally(test_listlike)
+    for k in test_listlike:
+        assert counts[k] == test_listlike.count(k)
+    assert not tally([])
+
+def test_fold_tally(test_listlike):
+    counted = {}
+    counted_get = counted.get
+    for elem in test_listlike:
+        counted[elem] = counted_get(elem, 0) + 1
+    folded = {}
+    fold_tally(folded, test_listlike, tally(test_listlike))
+    assert folded == counted
+    assert folded.keys() == counted.keys()
+    fold_tally(folded, test_listlike, tally(test_listlike), -1)
+    assert not any(folded.values())
+
+def test_iter_chunks():
+    assert list(iter_chunks(xrange(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_chunks("ab", 2)) == [["a", "b"]]
+    assert not list(iter_chunks([], 2))
+
+def test_chunked_add(TestCounter, test_listlike):
+    class Tiny(TestCounter):
+        __chunksize__ = 2
+    tiny = Tiny(test_listlike)
+    tiny.add(iter(test_listlike))
+    assert tiny == TestCounter(test_listlike) * 2
+    tiny.subtract(test_listlike)
+    assert tiny == TestCounter(test_listlike)
+
+def test_pivot_chunks(test_listlike):
+    for size in (1, 2, 3, 1 << 10):
+        buckets = {}
+        pivot_chunks(buckets, iter(test_listlike), size)
+        expect = {}
+        for elem, count in Counter(test_listlike).iteritems():
+            expect.setdefault(count, set()).add(elem)
+        assert buckets == expect
+
+def test_chunked_pivot(TestPivotCounter, test_listlike):
+    class Tiny(TestPivotCounter):
+        __chunksize__ = 2
+    tiny = Tiny(iter(test_listlike))
+    assert tiny == TestPivotCounter(Counter(test_listlike))
+    assert tiny.unpivot() == Counter(test_listlike)
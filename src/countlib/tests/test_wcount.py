@@ -0,0 +1,64 @@
+import pytest
+
+from countlib import AdvancedCounter
+from countlib import WindowCounter
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+    def __call__(self):
+        return self.now
+
+def test_window():
+    clock = Clock()
+    counter = WindowCounter("abracadabra", window=10, buckets=5, clock=clock)
+    assert counter == AdvancedCounter("abracadabra")
+    clock.now += 4
+    counter.add("abba")
+    assert counter == AdvancedCounter("abracadabraabba")
+    clock.now += 6
+    assert counter == AdvancedCounter("abba")
+    assert counter.most_common(1) == [("a", 2)] or counter.most_common(1) == [("b", 2)]
+    clock.now += 3.99
+    assert counter == AdvancedCounter("abba")
+    clock.now += 0.01
+    assert not counter
+    assert not counter.total._index
+
+def test_window_buckets(test_listlike):
+    clock = Clock()
+    counter = WindowCounter(window=60, buckets=6, clock=clock)
+    events = []
+    for elem in test_listlike * 5:
+        counter.add([elem])
+        events.append((clock.now // 10, elem))
+        clock.now += 4
+        expected = [ e for slot, e in events if slot > clock.now // 10 - 6 ]
+        assert counter == AdvancedCounter(expected)
+    assert sorted(counter.elements()) == sorted(counter.to_counter().elements())
+
+def test_jump():
+    clock = Clock()
+    counter = WindowCounter(x=3, window=5, buckets=5, clock=clock)
+    clock.now += 1e6
+    assert not counter
+    counter.add(y=2)
+    assert counter.most_common() == [("y", 2)]
+    clock.now -= 100 # clocks going back count into the current bucket
+    counter.add("y")
+    assert counter["y"] == 3
+
+def test_get():
+    clock = Clock()
+    counter = WindowCounter("ab", window=10, buckets=5, clock=clock)
+    assert counter.get("a") == 1
+    assert counter.get("z") is None
+    assert counter.get("z", "nope") == "nope"
+    clock.now += 10
+    assert counter.get("a", "gone") == "gone"
+
+def test_bad_input():
+    with pytest.raises(ValueError):
+        WindowCounter(window=0)
+    with pytest.raises(ValueError):
+        WindowCounter({"a": -1})
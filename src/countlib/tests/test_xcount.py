@@ -95,3 +95,91 @@ def test_pivot():
     troll = ExtremeCounter("trollofant")
     assert lol.pivot() - troll.pivot() == PivotCounter({1: ['l'], 2: ['!']})
     assert lol.pivot() + troll.pivot() == PivotCounter({1: ['r'], 2: ['!', 'a', 'f', 'n'], 3: ['t'], 4: ['o'], 5: ['l']})
+
+
+slices = [ slice(a, b, s) for a in (None, 0, 1, 2, 3, 7) for b in (None, 1, 2, 3, 6, 9) for s in (None, -1) ]
+
+def test_indexed_get_slicing(abctwo):
+    indexed = abctwo.copy()
+    indexed.build_index()
+    for s in slices:
+        assert indexed[s] == abctwo[s]
+
+def test_indexed_del_slicing(abctwo):
+    for s in slices:
+        a, b = abctwo.copy(), abctwo.copy()
+        b.build_index()
+        del a[s]
+        del b[s]
+        assert a == b
+        assert b._index == PivotCounter(b)
+        assert b._index.counts == sorted(set(b.values()))
+
+def test_index_writes(abctwo):
+    x = abctwo.copy()
+    index = x.build_index()
+    x.add("aaaxyz")
+    x.subtract("gggggg")
+    x["q"] = 12
+    x["c"] = 12
+    del x["b"]
+    del x["not there"]
+    x.pop("d")
+    x.pop("d", None)
+    x.popitem()
+    x.setdefault("n", 5)
+    x.update({"a": 1, "z": 7}, y=3)
+    x += 1
+    x -= ExtremeCounter("hh")
+    assert index is x._index
+    assert index == PivotCounter(x)
+    assert index.counts == sorted(set(x.values()))
+    x.clear()
+    assert not index and not index.counts
+
+def test_index_unhashable_count(abc):
+    abc.build_index()
+    try:
+        abc["a"] = [1]
+        assert False
+    except TypeError:
+        pass
+    assert abc["a"] == 1
+    assert abc._index == PivotCounter(abc)
+
+def test_drop_index(abctwo):
+    abctwo.build_index()
+    abctwo.drop_index()
+    abctwo["x"] = 3
+    assert abctwo._index is None
+    assert abctwo[3:4] == ExtremeCounter({'b': 3, 'x': 3, 'i': 3})
+
+def test_live_pivot(abctwo):
+    x = abctwo.copy()
+    live = x.pivot(live=True)
+    assert live is x._index and live is x.pivot(live=True)
+    assert live == x.pivot(cls=PivotCounter)
+    x.add("abcxyz")
+    x.subtract(ExtremeCounter("ddd"))
+    x["x"] = 7
+    del x["y"]
+    assert live == x.pivot(cls=PivotCounter)
+    assert live.unpivot() == +x
+    snapshot = x.pivot()
+    assert snapshot == live and snapshot is not live
+    assert snapshot.unpivot().__class__ is ExtremeCounter
+    x["z"] = 9
+    assert 9 in live and 9 not in snapshot
+
+def test_indexed_most_common(abctwo):
+    x = abctwo.copy()
+    x.build_index()
+    x.add("ggaz")
+    del x["c"]
+    count = lambda items: [c for e, c in items]
+    for n in (None, -1, 0, 1, 3, 20):
+        for inverse in (False, True):
+            plain = ExtremeCounter(x).most_common(n, inverse=inverse)
+            assert count(x.most_common(n, inverse=inverse)) == count(plain)
+    assert x.most_common(1) == [('g', 8)]
+    assert x.most_common(1, inverse=True)[0][1] == 1
@@ -0,0 +1,105 @@
+""" Little helpers shared by the counters. """
+
+from collections import defaultdict
+from itertools import islice
+
+try: # the C helper behind collections.Counter (python 3 only)
+    from _collections import _count_elements
+except ImportError:
+    _count_elements = None
+
+_missing = object()
+
+
+def tally(iterable):
+    """ Count the elements of iterable into a new dict and return it.
+        The C accelerated helper of collections is used if available,
+        otherwise the elements are counted into a defaultdict, which
+        saves the Python level get() call per element.
+    """
+    if _count_elements is not None:
+        counts = {}
+        _count_elements(counts, iterable)
+        return counts
+    counts = defaultdict(int)
+    for elem in iterable:
+        counts[elem] += 1
+    return counts
+
+
+def fold_tally(mapping, elements, counts, sign=1, setitem=None):
+    """ Add the tally counts of elements into mapping, one write per distinct
+        element (subtract them for a negative sign). Elements new to mapping
+        are inserted in their order of first appearance in elements, so the
+        mapping ends up just like it had been counted in one by one.
+        The writes go through setitem, if given.
+    """
+    mapping_get = mapping.get
+    if setitem is None:
+        setitem = mapping.__setitem__
+    fresh = {}
+    for elem, count in counts.iteritems():
+        old = mapping_get(elem, _missing)
+        if old is _missing:
+            fresh[elem] = count
+        else:
+            setitem(elem, old + sign * count)
+    if fresh: # find the first appearances, stop as soon as all are placed
+        fresh_pop = fresh.pop
+        for elem in elements:
+            if elem in fresh:
+                setitem(elem, sign * fresh_pop(elem))
+                if not fresh:
+                    break
+
+
+def iter_chunks(iterable, size):
+    """ Iterator over lists of (at most) size consecutive items of iterable.
+    """
+    it = iter(iterable)
+    chunk = list(islice(it, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, size))
+
+
+def pivot_chunks(buckets, iterable, size):
+    """ Pivot the elements of iterable into buckets, a dict of counts to sets
+        of elements, which should start out empty. Only size elements and
+        their tally are held at a time: the elements of a chunk that were
+        counted before are looked up in the buckets, probing from the
+        smaller side, and moved up by their count in the chunk.
+    """
+    buckets_sdf = buckets.setdefault
+    for chunk in iter_chunks(iterable, size):
+        fresh = tally(chunk)
+        moves = []
+        for count, bucket in buckets.iteritems():
+            if not fresh:
+                break
+            if len(bucket) < len(fresh):
+                hits = filter(fresh.__contains__, bucket)
+            else:
+                hits = filter(bucket.__contains__, fresh)
+            for elem in hits:
+                moves.append((elem, count, count + fresh.pop(elem)))
+        for elem, old, new in moves:
+            bucket = buckets[old]
+            bucket.discard(elem)
+            if not bucket:
+                del buckets[old]
+            buckets_sdf(new, set()).add(elem)
+        for elem, count in fresh.iteritems():
+            buckets_sdf(count, set()).add(elem)
+
+
+_MASK64 = (1 << 64) - 1
+
+def mix64(value, seed=0):
+    """ Scramble an integer (like hash(elem)) into 64 well mixed bits, with
+        the splitmix64 finalizer. Different seeds give independent hashes.
+    """
+    z = (value + (seed + 1) * 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
@@ -0,0 +1,145 @@
+""" Counters over a sliding window of time. """
+from collections import Mapping
+from itertools import chain, repeat, starmap
+from time import time
+from acount import AdvancedCounter
+from xcount import ExtremeCounter
+from tools import tally, iter_chunks
+
+
+class WindowCounter(Mapping):
+    """ Counts the elements added during the last window seconds. The
+        window is split into buckets intervals, kept in a ring of counters,
+        one per interval. A running total of all buckets is kept along (as
+        an indexed ExtremeCounter), so reads and most_common() need no
+        rebuild. When time moves on, the buckets of intervals that fell out
+        of the window are subtracted from the total and dropped, which costs
+        as much as the buckets had distinct elements.
+
+        The window slides by whole intervals: an element counts until window
+        seconds after the start of the interval it was added in. Time is
+        read from clock (time.time by default). Only positive counts can be
+        added; there is no subtract.
+    """
+    __chunksize__ = 1 << 16
+
+    def __init__(self, iterable=None, window=300.0, buckets=60, clock=time, **kwds):
+        """ Create a new, empty WindowCounter over window seconds, in the
+            given number of buckets. And if given, count elements from an
+            input iterable. Or, add in the counts of a mapping.
+        """
+        if buckets < 1 or window <= 0:
+            raise ValueError("need a positive window and at least one bucket")
+        self.window, self.clock = window, clock
+        self.interval = float(window) / buckets
+        self.ring = [ None ] * buckets
+        self.total = ExtremeCounter()
+        self.total.build_index()
+        self._slot = self._slot_of(clock())
+        self.add(iterable, **kwds)
+
+    def _slot_of(self, now):
+        return int(now // self.interval)
+
+    def advance(self, now=None):
+        """ Move the window on to now (default: the clock's time),
+            expiring the buckets of the intervals left behind.
+        """
+        slot = self._slot_of(self.clock() if now is None else now)
+        if slot <= self._slot: # same interval, or the clock went back
+            return
+        ring, size = self.ring, len(self.ring)
+        for passed in xrange(self._slot + 1, min(slot, self._slot + size) + 1):
+            bucket = ring[passed % size]
+            if bucket is not None:
+                self._expire(bucket)
+                ring[passed % size] = None
+        self._slot = slot
+
+    def _expire(self, bucket):
+        """ Take the counts of bucket out of the total.
+        """
+        total = self.total
+        for elem, count in bucket.iteritems():
+            newcount = total[elem] - count
+            if newcount > 0:
+                total[elem] = newcount
+            else:
+                del total[elem]
+
+    def _bucket(self):
+        """ The bucket of the current interval.
+        """
+        ring = self.ring
+        i = self._slot % len(ring)
+        if ring[i] is None:
+            ring[i] = AdvancedCounter()
+        return ring[i]
+
+    def add(self, iterable=None, **kwds):
+        """ Count elements from an iterable (or add the counts of a mapping)
+            in the current interval.
+        """
+        if iterable is not None:
+            self.advance()
+            if isinstance(iterable, Mapping):
+                if any(count <= 0 for count in iterable.itervalues()):
+                    raise ValueError("only positive counts can be added to a window")
+                self._add_counts(iterable)
+            else: # count in bulk, then add once per distinct element
+                for chunk in iter_chunks(iterable, self.__chunksize__):
+                    self._add_counts(tally(chunk))
+        if kwds:
+            self.add(kwds)
+
+    def _add_counts(self, counts):
+        self._bucket().add(counts)
+        self.total.add(counts)
+
+    def __getitem__(self, elem):
+        """ The count of elem in the window. Elements not counted are zero.
+        """
+        self.advance()
+        return self.total.get(elem, 0)
+
+    def __contains__(self, elem):
+        self.advance()
+        return elem in self.total
+
+    def get(self, elem, default=None):
+        self.advance()
+        return self.total.get(elem, default)
+
+    def __iter__(self):
+        self.advance()
+        return iter(self.total)
+
+    def __len__(self):
+        self.advance()
+        return len(self.total)
+
+    def iteritems(self):
+        self.advance()
+        return self.total.iteritems()
+
+    def most_common(self, n=None, inverse=False):
+        """ Like AdvancedCounter.most_common(), read off the total's index.
+        """
+        self.advance()
+        return self.total.most_common(n, inverse=inverse)
+
+    def elements(self):
+        """ Like AdvancedCounter.elements().
+        """
+        return chain.from_iterable(starmap(repeat, self.iteritems()))
+
+    def to_counter(self, cls=AdvancedCounter):
+        """ Copy the counts of the window into a counter.
+        """
+        return cls(dict(self.iteritems()))
+
+    def __repr__(self):
+        """ Output like AdvancedCounter, plus the window.
+        """
+        items = ', '.join(map('%r: %r'.__mod__, self.most_common()))
+        return '%s({%s}, window=%r)' % (self.__class__.__name__, items, self.window)
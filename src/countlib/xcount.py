@@ -1,11 +1,7 @@
 """ Counters strike! """
-from collections import Counter
-from collections import Mapping
 from pivot import PivotCounter
 from acount import AdvancedCounter
-
-from operator import itemgetter
-from heapq import nlargest, nsmallest
+from countindex import CountIndex
 
 class ExtremeCounter(AdvancedCounter):
     """ Even more extreme! This version supports slicing by values (counts).
@@ -16,8 +12,12 @@ class ExtremeCounter(AdvancedCounter):
         with only the keys, whoes values lie in the requested slicing range.
         Currently only one other step arument is implemented:
         If step is -1, then the slicing range is inverted.
+        Optionally a sorted index of counts can be kept (see build_index),
+        which makes slicing cost O(log n + k) instead of a full scan, and
+        serves most_common(n) as a top-n tracker.
     """
     __pivot__ = PivotCounter
+    _index = None
 
     def __getitem__(self, key):
         try:
@@ -26,27 +26,27 @@ class ExtremeCounter(AdvancedCounter):
             if ex.message == "unhashable type" and isinstance(key, slice):
                 start, stop, step = key.start, key.stop, key.step
                 if step is None:
-                    if start is not None and stop is not None:
-                        return self.__class__(**dict([ i for i in self.iteritems() if start <= i[1] < stop ]))
-                    if start is not None and stop is None:
-                        return self.__class__(**dict([ i for i in self.iteritems() if start <= i[1] ]))
-                    if start is None and stop is not None:
-                        return self.__class__(**dict([ i for i in self.iteritems() if i[1] < stop ]))
                     if start is None and stop is None:
                         return self.copy()
+                    return self.__class__(dict(self._slice_items(start, stop)))
                 elif step == -1:
-                    if start is not None and stop is not None:
-                        return self.__class__(**dict([ i for i in self.iteritems() if not start <= i[1] < stop ]))
-                    if start is not None and stop is None:
-                        return self.__class__(**dict([ i for i in self.iteritems() if not start <= i[1] ]))
-                    if start is None and stop is not None:
-                        return self.__class__(**dict([ i for i in self.iteritems() if not i[1] < stop ]))
                     if start is None and stop is None:
                         return self.__class__()
+                    return self.__class__(dict(self._slice_items(start, stop, True)))
                 raise KeyError(key)
             raise ex
         raise KeyError(key)
 
+    def __setitem__(self, key, value):
+        """ Like dict.__setitem__() but keeps the count index (if any) in sync.
+        """
+        index = self._index
+        if index is not None:
+            if key in self:
+                index.move(key, dict.__getitem__(self, key), value)
+            else:
+                index.insert(key, value)
+        AdvancedCounter.__setitem__(self, key, value)
 
     def __delitem__(self, key):
         """ Like dict.__delitem__() but does not raise KeyError for missing values.
@@ -54,40 +54,142 @@ class ExtremeCounter(AdvancedCounter):
         """
         try:
             if key in self:
-                dict.__delitem__(self, key)
+                if self._index is not None:
+                    self._index.discard(key, dict.__getitem__(self, key))
+                AdvancedCounter.__delitem__(self, key)
         except TypeError, ex:
             if ex.message == 'unhashable type' and isinstance(key, slice):
                 start, stop, step = key.start, key.stop, key.step
                 if step is None:
-                    if start is not None and stop is not None:
-                        for k, v in [ i for i in self.iteritems() if start <= i[1] < stop ]:
-                            dict.__delitem__(self, k)
-                    if start is not None and stop is None:
-                        for k, v in [ i for i in self.iteritems() if start <= i[1] ]:
-                            dict.__delitem__(self, k)
-                    if start is None and stop is not None:
-                        for k, v in [ i for i in self.iteritems() if i[1] < stop ]:
-                            dict.__delitem__(self, k)
                     if start is None and stop is None:
-                        for k in self.keys():
-                            dict.__delitem__(self, k)
+                        self.clear()
+                    else:
+                        self._del_slice(start, stop)
                 elif step == -1:
-                    if start is not None and stop is not None:
-                        for k, v in [ i for i in self.iteritems() if not start <= i[1] < stop ]:
-                            dict.__delitem__(self, k)
-                    if start is not None and stop is None:
-                        for k, v in [ i for i in self.iteritems() if not start <= i[1] ]:
-                            dict.__delitem__(self, k)
-                    if start is None and stop is not None:
-                        for k, v in [ i for i in self.iteritems() if not i[1] < stop ]:
-                            dict.__delitem__(self, k)
                     if start is None and stop is None:
                         pass
+                    else:
+                        self._del_slice(start, stop, True)
+
+    def _slice_items(self, start, stop, invert=False):
+        """ List the (element, count) pairs with start <= count < stop.
+            Either bound may be None. If invert is true, list all others.
+            Uses the count index if there is one, otherwise scans all items.
+        """
+        if self._index is not None:
+            return list(self._index.iter_range(start, stop, invert))
+        if start is None:
+            inside = lambda count: count < stop
+        elif stop is None:
+            inside = lambda count: start <= count
+        else:
+            inside = lambda count: start <= count < stop
+        if invert:
+            return [ i for i in self.iteritems() if not inside(i[1]) ]
+        return [ i for i in self.iteritems() if inside(i[1]) ]
+
+    def _del_slice(self, start, stop, invert=False):
+        """ Delete the elements with start <= count < stop (or all others).
+            With a count index, only the matching buckets are visited.
+        """
+        index = self._index
+        delete = dict.__delitem__ if self._head is None else AdvancedCounter.__delitem__
+        if index is None:
+            for k, v in self._slice_items(start, stop, invert):
+                delete(self, k)
+            return
+        for count in index.count_range(start, stop, invert):
+            for k in index[count]:
+                delete(self, k)
+            dict.__delitem__(index, count)
+        lo, hi = index.bounds(start, stop)
+        if invert:
+            index.counts[:] = index.counts[lo:hi]
+        else:
+            del index.counts[lo:hi]
+
+    def update(self, *args, **kwds):
+        """ Like dict.update() but keeps the count index (if any) in sync.
+        """
+        if self._index is None:
+            return AdvancedCounter.update(self, *args, **kwds)
+        for key, value in dict(*args, **kwds).iteritems():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        """ Like dict.setdefault() but keeps the count index (if any) in sync.
+        """
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        """ Like dict.pop() but keeps the count index (if any) in sync.
+        """
+        if self._index is not None and key in self:
+            self._index.discard(key, dict.__getitem__(self, key))
+        return AdvancedCounter.pop(self, key, *default)
+
+    def popitem(self):
+        """ Like dict.popitem() but keeps the count index (if any) in sync.
+        """
+        key, value = AdvancedCounter.popitem(self)
+        if self._index is not None:
+            self._index.discard(key, value)
+        return key, value
+
+    def clear(self):
+        """ Like dict.clear() but keeps the count index (if any) in sync.
+        """
+        AdvancedCounter.clear(self)
+        if self._index is not None:
+            self._index.clear()
+
+    def most_common(self, n=None, count_func=None, inverse=False):
+        """ Like AdvancedCounter.most_common(), but read off the count index
+            if it is kept, which takes O(n) instead of a pass over all items.
+            Ties are then listed in no particular order. The index is kept
+            here and not in AdvancedCounter, whose writes go straight to
+            dict (see AdvancedCounter._rehook()): keeping it costs on every
+            write, so it is for the counters that build_index() asks for.
+        """
+        if self._index is None or count_func is not None:
+            return AdvancedCounter.most_common(self, n, count_func, inverse)
+        return self._index.top(n, inverse)
+
+    def build_index(self):
+        """ Start keeping a sorted index of counts to elements. From now on
+            every write also updates the index, and slicing by values costs
+            O(log n + k) instead of a scan over all items. Counts have to be
+            hashable and orderable while the index is kept.
+            Copies and pickles of the counter are not indexed.
+        """
+        if self._index is None:
+            self._index = CountIndex(self)
+        return self._index
+
+    def drop_index(self):
+        """ Stop keeping the count index.
+        """
+        self._index = None
 
-    def pivot(self, cls=None):
-        """ The pivot table of the Counter.
+    def pivot(self, cls=None, live=False):
+        """ The pivot table of the Counter. If live is true, the count index
+            is returned (and built if needed): a PivotCounter view that moves
+            elements between its buckets as the counter is written to, so
+            reading it costs nothing extra. Treat the view as read-only, and
+            note that it goes stale once the index is dropped. Live views
+            are only to be had from ExtremeCounters: an AdvancedCounter
+            keeps no index, so PivotCounter(counter) is a copy made in a
+            pass over all items.
         """
+        if live:
+            return self.build_index()
         if cls:
             return cls(self)
+        if self._index is not None and self.__pivot__ is PivotCounter:
+            result = self._index.copy() # no need to hash all counts again
+            result.__unpivot__ = self.__class__
+            return result
         return self.__pivot__(self)
 